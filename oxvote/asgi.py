@@ -19,13 +19,19 @@ django_asgi_app = get_asgi_application()
 # Django가 완전히 초기화된 후에 Channels 관련 import
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
+from channels.security.websocket import AllowedHostsOriginValidator
 from voting import routing
+from voting.signals import vote_broadcaster
 
-application = ProtocolTypeRouter({
+# 브로드캐스트 디스패처가 서버 이벤트 루프에서 group_send 하도록 루프를 알려 줌
+application = vote_broadcaster.asgi(ProtocolTypeRouter({
     "http": django_asgi_app,
-    "websocket": AuthMiddlewareStack(
-        URLRouter(
-            routing.websocket_urlpatterns
+    # WebSocket은 CSRF 보호를 받지 않으므로 (cast_vote 등 쓰기 메시지) ALLOWED_HOSTS의 Origin만 허용
+    "websocket": AllowedHostsOriginValidator(
+        AuthMiddlewareStack(
+            URLRouter(
+                routing.websocket_urlpatterns
+            )
         )
     ),
-})
+}))
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -63,8 +64,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'voting.middleware.MetricsMiddleware',  # /metrics 용 요청 시간, 쿼리 수 기록
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Railway 배포를 위한 정적 파일 서빙
+    'voting.middleware.AsyncWhiteNoiseMiddleware',  # Railway 배포를 위한 정적 파일 서빙 (ASGI에서도 비동기로 동작)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -180,6 +182,27 @@ if not DEBUG:
     # Referrer policy
     SECURE_REFERRER_POLICY = 'strict-origin-when-cross-origin'
 
+# 캐시 설정 (단일 daphne 프로세스 기준 로컬 메모리 캐시)
+# LocMemCache는 MAX_ENTRIES(기본 300)를 넘으면 항목의 1/3을 지우므로 넉넉하게 잡고,
+# 캐시가 유일한 기록인 실시간 상태(방 버전/스냅샷/델타 기록, 접속자 수)는 코드 조회 캐시
+# (없는 코드도 캐시함)에 밀려 지워지지 않도록 별도 realtime 캐시에 둔다.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'oxvote',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '10000')),
+        },
+    },
+    'realtime': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'oxvote-realtime',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('REALTIME_CACHE_MAX_ENTRIES', '100000')),
+        },
+    },
+}
+
 # Channels 설정
 CHANNEL_LAYERS = {
     'default': {
@@ -190,6 +213,47 @@ CHANNEL_LAYERS = {
     },
 }
 
+# 방별 실시간 통계 브로드캐스트 최소 간격 (초, 0이면 매 투표마다 전송)
+VOTE_BROADCAST_INTERVAL = float(os.getenv('VOTE_BROADCAST_INTERVAL', '0.2'))
+# 백그라운드 브로드캐스트 대기열 최대 방 수 (초과한 방은 overflow 맵으로 미뤄졌다가 자리가 나면 예약됨;
+# overflow 맵에는 상한이 없으므로 이 값이 메모리 사용량을 제한하지는 않음)
+VOTE_BROADCAST_QUEUE_SIZE = int(os.getenv('VOTE_BROADCAST_QUEUE_SIZE', '1000'))
+# ?ack=1 WebSocket 클라이언트의 통계 프레임 ack를 기다리는 최대 시간 (초, 지나면 다음 프레임 전송)
+VOTE_STATS_ACK_TIMEOUT = float(os.getenv('VOTE_STATS_ACK_TIMEOUT', '5'))
+
+# 투표 저장 방식: 'direct' (요청마다 INSERT) 또는 'buffered' (메모리 버퍼 후 주기적 bulk 저장)
+VOTE_INGEST_MODE = os.getenv('VOTE_INGEST_MODE', 'direct')
+# buffered 모드의 flush 주기 (ms)
+VOTE_INGEST_FLUSH_MS = int(os.getenv('VOTE_INGEST_FLUSH_MS', '100'))
+# buffered 모드에서 아직 저장되지 않은 투표를 기록하는 저널 파일 (프로세스 강제 종료 후 복구, 빈 값이면 사용 안 함)
+# 기본값은 소스 트리가 아닌 임시 디렉터리 (컨테이너 안에서 프로세스가 재시작되어도 남음)
+VOTE_INGEST_JOURNAL = os.getenv(
+    'VOTE_INGEST_JOURNAL',
+    os.path.join(tempfile.gettempdir(), f'oxvote_vote_ingest_{os.getenv("RAILWAY_DEPLOYMENT_ID", "local")}.journal'),
+)
+
+# 접속자 수 하트비트 간격 (초, 비정상 종료한 연결은 최대 두 간격 뒤에 빠짐)
+PRESENCE_HEARTBEAT = int(os.getenv('PRESENCE_HEARTBEAT', '30'))
+
+# /metrics, /metrics/traces 접근 토큰 (Authorization: Bearer <토큰> 헤더가 있어야 응답, 비어 있으면 DEBUG에서만 공개)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# 요청 프로파일러 (켜면 voting 뷰 요청마다 쿼리 수, DB/템플릿 시간을 재고 느린 요청과 반복 쿼리를 로그로 남김)
+REQUEST_PROFILER = os.getenv('REQUEST_PROFILER', 'false').lower() == 'true'
+# 이 시간(ms) 이상 걸린 요청은 경고 로그
+PROFILER_SLOW_MS = int(os.getenv('PROFILER_SLOW_MS', '500'))
+# 같은 SQL이 이 횟수 이상 실행되면 N+1 의심으로 경고 로그
+PROFILER_REPEATED_QUERY_THRESHOLD = int(os.getenv('PROFILER_REPEATED_QUERY_THRESHOLD', '5'))
+# 쿼리 목록까지 담은 트레이스를 보관할 요청 비율 (/metrics/traces 로 내보냄)
+PROFILER_SAMPLE_RATE = float(os.getenv('PROFILER_SAMPLE_RATE', '0.01'))
+
+if REQUEST_PROFILER:
+    MIDDLEWARE.insert(1, 'voting.middleware.ProfilerMiddleware')
+    TEMPLATES[0]['BACKEND'] = 'voting.profiler.ProfiledDjangoTemplates'
+
+# 4자리 간단 코드가 모두 사용 중일 때 5자리 코드로 확장할지 여부
+SIMPLE_CODE_ALLOW_5_DIGITS = os.getenv('SIMPLE_CODE_ALLOW_5_DIGITS', 'true').lower() == 'true'
+
 # 로깅 설정 (디버깅용)
 LOGGING = {
     'version': 1,
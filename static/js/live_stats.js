@@ -0,0 +1,321 @@
+// 발표자/결과 화면 공용 실시간 통계 수신
+// WebSocket → Server-Sent Events → HTTP 롱폴링 순으로 폴백하며, 버전이 있는 통계
+// 프레임(vote_stats/short_answer_stats: 전체 스냅샷, vote_delta: 이전 버전과의 차이)을 반영한다.
+//
+// options:
+//   questionId  질문 id
+//   socketPath  WebSocket 경로 (예: `/ws/vote/${questionId}/`)
+//   pollPath    롱폴링 통계 API 경로 (예: `/api/stats/${questionId}/`)
+//   presenter   발표자 화면이면 true (접속자 수에서 제외, 접속자 수 프레임 수신)
+//   onStats     화면에 표시할 통계를 받는 함수
+//   onPresence  접속자 수를 받는 함수 (발표자 화면)
+function createLiveStats(options) {
+    const live = {
+        socket: null,
+        websocketFailed: false,
+    };
+    let reconnectTimeout = null;
+    let isConnecting = false;
+    let polling = false;  // HTTP 롱폴링 진행 여부
+    let pollEtag = null;  // 마지막으로 받은 통계 버전 (ETag)
+    let eventSource = null;
+    let eventStreamFailed = false;
+    let stopped = false;
+
+    let statsVersion = null;
+    let currentStats = null;
+    let resumeRequested = false;
+
+    function withPercentages(stats) {
+        const total = stats.o_votes + stats.x_votes;
+        stats.total_votes = total;
+        stats.o_percentage = total ? Math.round(stats.o_votes / total * 1000) / 10 : 0;
+        stats.x_percentage = total ? Math.round(stats.x_votes / total * 1000) / 10 : 0;
+        return stats;
+    }
+
+    // 통계 메시지를 현재 상태에 반영하고 화면에 표시할 통계를 반환 (반영할 것이 없으면 null)
+    function applyStatsMessage(data) {
+        if (data.type !== 'vote_delta') {
+            if (statsVersion !== null && data.v < statsVersion) {
+                return null;  // 늦게 도착한 예전 스냅샷
+            }
+            statsVersion = data.v;
+            currentStats = data.data;
+            resumeRequested = false;
+            return currentStats;
+        }
+        if (statsVersion !== null && data.v <= statsVersion) {
+            return null;  // 이미 반영한 버전
+        }
+        if (currentStats === null || data.v !== statsVersion + 1) {
+            // 중간 버전을 놓침: 마지막으로 받은 버전 이후만 다시 요청
+            requestResume();
+            return null;
+        }
+        currentStats.o_votes += data.o || 0;
+        currentStats.x_votes += data.x || 0;
+        if (data.show_results !== undefined) {
+            currentStats.show_results = data.show_results;
+        }
+        statsVersion = data.v;
+        resumeRequested = false;
+        return withPercentages(currentStats);
+    }
+
+    // 놓친 버전 이후의 변경분을 다시 요청 (WebSocket은 resume 메시지, SSE는 ?v=로 다시 연결)
+    function requestResume() {
+        if (resumeRequested) {
+            return;
+        }
+        if (live.send({'type': 'resume', 'v': statsVersion})) {
+            resumeRequested = true;
+        } else if (eventSource) {
+            resumeRequested = true;
+            eventSource.close();
+            eventSource = null;
+            startEventStream();
+        }
+    }
+
+    function handleMessage(data) {
+        if (data.type === 'presence') {
+            if (options.onPresence) {
+                options.onPresence(data.count);
+            }
+            return;
+        }
+        const stats = applyStatsMessage(data);
+        if (stats) {
+            options.onStats(stats);
+        }
+    }
+
+    function isStatsMessage(data) {
+        return data.type === 'vote_stats' || data.type === 'vote_delta' || data.type === 'short_answer_stats';
+    }
+
+    // 통계 프레임을 화면에 반영했다고 서버에 알림 (ack가 올 때까지 서버는 새 프레임을 최신 것 하나로 합쳐 둠)
+    function ackStatsMessage(data) {
+        if (data.v !== undefined) {
+            live.send({'type': 'ack', 'v': data.v});
+        }
+    }
+
+    // WebSocket 업그레이드가 막힌 네트워크용 Server-Sent Events 스트림 (끊기면 브라우저가 자동 재접속)
+    function startEventStream() {
+        if (eventSource) {
+            return;
+        }
+        let received = false;
+        const params = new URLSearchParams();
+        if (statsVersion !== null) {
+            params.set('v', statsVersion);
+        }
+        if (options.presenter) {
+            params.set('role', 'presenter');
+        }
+        const query = params.toString() ? `?${params}` : '';
+        eventSource = new EventSource(`/api/events/${options.questionId}/${query}`);
+        eventSource.onmessage = function(e) {
+            received = true;
+            handleMessage(JSON.parse(e.data));
+        };
+        eventSource.onerror = function() {
+            // 한 번도 받지 못했으면 스트림도 막힌 것으로 보고 롱폴링으로 전환
+            if (!received) {
+                eventSource.close();
+                eventSource = null;
+                eventStreamFailed = true;
+                startFallbackPolling();
+            }
+        };
+    }
+
+    function connectWebSocket() {
+        if (isConnecting || (live.socket && live.socket.readyState === WebSocket.CONNECTING)) {
+            return;
+        }
+        isConnecting = true;
+
+        // WebSocket URL 구성 (HTTPS인 경우 wss, HTTP인 경우 ws)
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        // 통계 프레임마다 ack를 보내고, 재접속이면 마지막으로 받은 버전을 보내 놓친 변경분만 받음
+        const params = new URLSearchParams({'ack': '1'});
+        if (statsVersion !== null) {
+            params.set('v', statsVersion);
+        }
+        if (options.presenter) {
+            // 발표자 화면은 접속자 수에서 제외
+            params.set('role', 'presenter');
+        }
+        const wsUrl = `${protocol}//${window.location.host}${options.socketPath}?${params}`;
+        console.log('Connecting to WebSocket:', wsUrl);
+
+        const socket = new WebSocket(wsUrl);
+        live.socket = socket;
+
+        socket.onopen = function() {
+            console.log('WebSocket connection opened');
+            isConnecting = false;
+            clearTimeout(reconnectTimeout);
+            reconnectTimeout = null;
+            resumeRequested = false;
+            // 새 통계는 서버가 푸시하므로 롱폴링 중단 (연결 직후 처음이면 전체, 재접속이면 놓친 변경분)
+            polling = false;
+        };
+
+        socket.onmessage = function(e) {
+            try {
+                const data = JSON.parse(e.data);
+                if (isStatsMessage(data)) {
+                    handleMessage(data);
+                    ackStatsMessage(data);
+                } else if (data.type === 'presence') {
+                    handleMessage(data);
+                } else if (data.type === 'error') {
+                    console.error('WebSocket error:', data.message);
+                }
+            } catch (error) {
+                console.error('Error parsing WebSocket message:', error);
+            }
+        };
+
+        socket.onclose = function(e) {
+            console.log('WebSocket connection closed:', e.code, e.reason);
+            isConnecting = false;
+            if (live.socket === socket) {
+                live.socket = null;
+            }
+
+            // 연결 실패가 지속되면 fallback 사용
+            if (e.code === 1006 || e.code === 1011) {
+                live.websocketFailed = true;
+                console.log('WebSocket repeatedly failed, switching to fallback polling');
+                startFallbackPolling();
+                return;
+            }
+
+            // 자동 재연결 (3초 후)
+            if (!stopped && !live.websocketFailed && !reconnectTimeout) {
+                reconnectTimeout = setTimeout(() => {
+                    reconnectTimeout = null;
+                    connectWebSocket();
+                }, 3000);
+            }
+        };
+
+        socket.onerror = function(e) {
+            console.error('WebSocket error:', e);
+            isConnecting = false;
+            live.websocketFailed = true;
+            startFallbackPolling();
+        };
+    }
+
+    function startFallbackPolling() {
+        console.log('Starting fallback polling mechanism');
+
+        // 기존 WebSocket 재연결 시도 중단
+        clearTimeout(reconnectTimeout);
+        reconnectTimeout = null;
+
+        // 먼저 SSE 스트림을 시도하고, 그것도 안 되면 롱폴링
+        if (window.EventSource && !eventStreamFailed) {
+            startEventStream();
+            return;
+        }
+
+        // 롱폴링 (서버가 통계가 바뀔 때까지 응답을 미루므로 응답을 받으면 바로 다시 요청)
+        if (!polling) {
+            polling = true;
+            pollStats();
+        }
+    }
+
+    function pollStats() {
+        if (!polling) {
+            return;
+        }
+        live.fetchStats(25)
+            .then(() => pollStats())
+            .catch(error => {
+                console.error('Error fetching stats via HTTP:', error);
+                setTimeout(pollStats, 2000);
+            });
+    }
+
+    // wait초 동안 통계가 바뀌기를 기다렸다가 가져옴 (바뀐 것이 없으면 304)
+    live.fetchStats = function(wait = 0) {
+        const headers = {'Accept': 'application/json'};
+        if (pollEtag) {
+            headers['If-None-Match'] = pollEtag;
+        }
+        return fetch(`${options.pollPath}?wait=${wait}`, {
+            method: 'GET',
+            headers: headers,
+            cache: 'no-store'
+        })
+        .then(response => {
+            if (response.status === 304) {
+                return null;
+            }
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            pollEtag = response.headers.get('ETag');
+            return response.json();
+        })
+        .then(data => {
+            if (data) {
+                options.onStats(data);
+            }
+        });
+    };
+
+    // 열린 WebSocket으로 메시지 전송 (연결되어 있지 않으면 false)
+    live.send = function(message) {
+        if (!live.socket || live.socket.readyState !== WebSocket.OPEN) {
+            return false;
+        }
+        live.socket.send(JSON.stringify(message));
+        return true;
+    };
+
+    // WebSocket으로 연결하고, 5초 안에 연결되지 않으면 fallback으로 전환
+    live.start = function() {
+        connectWebSocket();
+        setTimeout(() => {
+            if (!live.socket || live.socket.readyState !== WebSocket.OPEN) {
+                console.log('WebSocket connection timeout, switching to fallback');
+                live.websocketFailed = true;
+                startFallbackPolling();
+            }
+        }, 5000);
+    };
+
+    // 페이지가 다시 보일 때 끊긴 연결 복구
+    live.resume = function() {
+        if (!live.websocketFailed && (!live.socket || live.socket.readyState !== WebSocket.OPEN)) {
+            connectWebSocket();
+        } else if (live.websocketFailed && !polling && !eventSource) {
+            startFallbackPolling();
+        }
+    };
+
+    live.stop = function() {
+        stopped = true;
+        clearTimeout(reconnectTimeout);
+        reconnectTimeout = null;
+        polling = false;
+        if (eventSource) {
+            eventSource.close();
+            eventSource = null;
+        }
+        if (live.socket) {
+            live.socket.close();
+        }
+    };
+
+    return live;
+}
@@ -6,7 +6,7 @@ class QuestionAdmin(admin.ModelAdmin):
     list_display = ['text', 'question_type', 'simple_code', 'is_active', 'show_results', 'total_votes', 'created_at']
     list_filter = ['is_active', 'show_results', 'question_type', 'created_at']
     search_fields = ['text', 'simple_code']
-    readonly_fields = ['id', 'created_at', 'simple_code']
+    readonly_fields = ['id', 'created_at', 'simple_code', 'o_count', 'x_count', 'response_count', 'participant_count']
 
 @admin.register(Vote)
 class VoteAdmin(admin.ModelAdmin):
@@ -0,0 +1,102 @@
+"""벤치마크 관리 명령 공용 도구"""
+import os
+import statistics
+import tempfile
+import threading
+from contextlib import contextmanager
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from .ingest import vote_buffer
+
+# Redis 대신 사용하는 프로세스 내 채널 레이어
+IN_MEMORY_CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        'CONFIG': {'capacity': 10000},
+    },
+}
+
+@contextmanager
+def bench_environment(**settings_overrides):
+    """임시 테스트 DB와 메모리 채널 레이어에서 벤치마크 실행 (실제 DB는 건드리지 않음)
+
+    테스트 DB는 운영과 같은 파일 SQLite로 만든다. 기본값인 공유 캐시 메모리 DB는 여러
+    스레드가 동시에 쓰면 기다리지 않고 "database table is locked"로 실패한다.
+    buffered 투표 저널도 임시 디렉터리에 쓰고 끝나면 지운다 (운영 저널을 복구하거나 남기지 않음).
+    """
+    journal_dir = tempfile.TemporaryDirectory()
+    old_journal_path = vote_buffer.journal_path
+    vote_buffer.journal_path = os.path.join(journal_dir.name, 'votes.journal')
+    setup_test_environment()
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings.get('NAME')
+    test_settings['NAME'] = os.path.join(tempfile.gettempdir(), 'oxvote_bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with override_settings(
+            CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS,
+            ALLOWED_HOSTS=['*'],
+            SECURE_SSL_REDIRECT=False,
+            VOTE_INGEST_JOURNAL=vote_buffer.journal_path,
+            **settings_overrides
+        ):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        teardown_test_environment()
+        vote_buffer.journal_path = old_journal_path
+        journal_dir.cleanup()
+
+def percentile(values, pct):
+    """정렬된 값의 pct 백분위수 (nearest-rank)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def summarize_ms(seconds):
+    """초 단위 측정값 목록을 ms 단위 요약(dict)으로 변환"""
+    values = [value * 1000 for value in seconds]
+    return {
+        'count': len(values),
+        'mean_ms': round(statistics.fmean(values), 3) if values else 0.0,
+        'p50_ms': round(percentile(values, 50), 3),
+        'p99_ms': round(percentile(values, 99), 3),
+        'max_ms': round(max(values), 3) if values else 0.0,
+    }
+
+class QueryCounter:
+    """모든 스레드의 DB 연결에서 실행된 쿼리 수
+
+    with 블록에 들어간 뒤 새로 열리는 연결(sync_to_async 스레드, 디스패처 스레드 등)에도
+    실행 래퍼를 붙이므로, 비동기 처리 중 다른 스레드에서 실행된 쿼리도 센다.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def _install(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        for conn in connections.all():
+            self._install(conn)
+        connection_created.connect(self._install)
+        return self
+
+    def __exit__(self, *exc_info):
+        connection_created.disconnect(self._install)
+        for conn in connections.all():
+            if self in conn.execute_wrappers:
+                conn.execute_wrappers.remove(self)
+
@@ -0,0 +1,236 @@
+"""백그라운드 실시간 브로드캐스트 디스패처
+
+투표 요청 처리 경로에서 통계 계산과 group_send(Redis)를 분리한다.
+요청 쪽은 방(room) 키만 대기열에 넣고 바로 반환하며, 전용 스레드가
+방마다 최대 interval 초에 한 번씩 최신 상태를 읽어 전송한다.
+대기 중에 들어온 같은 방의 요청은 하나로 합쳐진다 (coalescing).
+채널 레이어 장애가 이어지면 서킷 브레이커가 열려 잠시 group_send만 건너뛴다.
+메시지는 그동안에도 만들므로 (방 스냅샷 갱신, HTTP 폴링용) 최신 상태가 유지되고,
+보내지 못한 방은 브레이커가 다시 시험 전송을 허용할 때 마지막 메시지를 보낸다.
+대기열이 가득 차 바로 넣지 못한 방도 버리지 않고 자리가 나면 대기열로 옮긴다.
+메시지를 만들다 실패한 방(DB 오류 등)은 점점 늘어나는 간격으로 다시 시도한다.
+"""
+import asyncio
+import threading
+import time
+import logging
+from channels.layers import get_channel_layer
+from django.db import close_old_connections
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# 메시지 생성 실패 시 재시도 간격 (초, 연속 실패마다 두 배, 최대 BUILD_RETRY_MAX)
+BUILD_RETRY_BASE = 0.5
+BUILD_RETRY_MAX = 30.0
+
+
+class CircuitBreaker:
+    """연속 실패가 threshold번 이상이면 reset_timeout 초 동안 호출 차단"""
+
+    def __init__(self, threshold=5, reset_timeout=10.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        if self.opened_at is None:
+            return True
+        # reset_timeout이 지나면 한 번 시험 전송 허용 (half-open)
+        return time.monotonic() >= self.retry_at()
+
+    def retry_at(self):
+        """다시 시험 전송을 허용하는 시각 (monotonic, 닫혀 있으면 None)"""
+        if self.opened_at is None:
+            return None
+        return self.opened_at + self.reset_timeout
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("Channel layer recovered, closing circuit breaker")
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            if self.opened_at is None:
+                logger.warning(f"Channel layer failed {self.failures} times, opening circuit breaker")
+            self.opened_at = time.monotonic()
+
+
+class BroadcastDispatcher:
+    """방 단위로 합쳐서 백그라운드 스레드에서 group_send 하는 디스패처
+
+    build_message(room)는 (group 이름, 메시지) 또는 None(전송 생략)을 반환한다.
+    """
+
+    def __init__(self, build_message, interval=0.2, maxsize=1000, breaker=None, send_timeout=5.0):
+        self._build_message = build_message
+        self.interval = interval
+        self.maxsize = maxsize
+        self.send_timeout = send_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._cond = threading.Condition()
+        self._pending = {}  # room -> 전송 예정 시각 (monotonic)
+        self._overflow = {}  # 대기열이 가득 차 기다리는 방 (들어온 순서 유지, 값은 None)
+        self._last_sent = {}  # room -> 마지막 전송 시각
+        self._unsent = {}  # room -> 보내지 못한 마지막 (group, 메시지), 디스패처 스레드 전용
+        self._build_failures = {}  # room -> 연속 메시지 생성 실패 횟수, 디스패처 스레드 전용
+        self._thread = None
+        self._loop = None
+        self._server_loop = None
+        self.deferred = 0
+
+    def request(self, room):
+        """room 브로드캐스트 요청 (블로킹 없이 대기열에 넣고 바로 반환)"""
+        with self._cond:
+            if room in self._pending or room in self._overflow:
+                # 이미 대기 중인 전송이 최신 상태를 보내므로 합침
+                return
+            now = time.monotonic()
+            self._schedule(room, max(now, self._last_sent.get(room, 0) + self.interval))
+            self._ensure_worker()
+            self._cond.notify()
+
+    def _schedule(self, room, at):
+        """room을 at에 전송하도록 대기열에 넣음, 가득 차 있으면 overflow에서 기다림 (self._cond 보유 상태)"""
+        if room in self._pending:
+            return
+        if len(self._pending) >= self.maxsize:
+            if room not in self._overflow:
+                self.deferred += 1
+                logger.warning(f"Broadcast queue full, deferring update for {room}")
+                self._overflow[room] = None
+            return
+        self._pending[room] = at
+
+    def _promote_overflow(self, now):
+        """대기열에 자리가 나면 overflow의 방을 들어온 순서대로 옮김 (self._cond 보유 상태)"""
+        while self._overflow and len(self._pending) < self.maxsize:
+            room = next(iter(self._overflow))
+            del self._overflow[room]
+            self._pending[room] = max(now, self._last_sent.get(room, 0) + self.interval)
+
+    def bind_loop(self, loop):
+        """group_send를 실행할 ASGI 서버의 이벤트 루프 지정
+
+        채널 레이어의 연결과 대기열은 만들어진 루프에 묶여 있다 (InMemoryChannelLayer는
+        다른 루프에서 넣은 메시지로 대기 중인 컨슈머를 깨우지 못함). 서버 루프가 돌고 있으면
+        그 루프에서 전송하고, 없으면 디스패처 스레드의 자체 루프를 사용한다.
+        """
+        self._server_loop = loop
+
+    def asgi(self, application):
+        """호출될 때마다 현재 이벤트 루프를 bind_loop 하는 ASGI 애플리케이션으로 감쌈"""
+        async def app(scope, receive, send):
+            self.bind_loop(asyncio.get_running_loop())
+            return await application(scope, receive, send)
+        return app
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='broadcast-dispatcher', daemon=True)
+            self._thread.start()
+
+    def _next_due(self):
+        """전송할 방 목록을 꺼내고, 없으면 다음 예정 시각까지 대기 (self._cond 보유 상태)"""
+        while True:
+            now = time.monotonic()
+            due = [room for room, at in self._pending.items() if at <= now]
+            if due:
+                for room in due:
+                    del self._pending[room]
+                    self._last_sent[room] = now
+                self._promote_overflow(now)
+                self._prune(now)
+                return due
+            timeout = min(self._pending.values()) - now if self._pending else None
+            self._cond.wait(timeout)
+
+    def _prune(self, now):
+        stale = [room for room, sent in self._last_sent.items()
+                 if now - sent > self.interval and room not in self._pending]
+        for room in stale:
+            del self._last_sent[room]
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        while True:
+            with self._cond:
+                rooms = self._next_due()
+            for room in rooms:
+                self._dispatch(room)
+            close_old_connections()
+
+    def _dispatch(self, room):
+        # 브레이커가 열려 있어도 메시지는 만듦 (방 스냅샷 갱신은 HTTP 폴링 폴백이 읽음)
+        try:
+            built = self._build_message(room)
+        except Exception as e:
+            metrics.broadcast_build_errors.inc()
+            logger.error(f"Error building broadcast for {room}: {e}")
+            self._retry_build(room)
+            return
+        self._build_failures.pop(room, None)
+        if built is None:
+            # 바뀐 것이 없어도 장애 중에 보내지 못한 메시지가 있으면 그것을 보냄
+            built = self._unsent.pop(room, None)
+            if built is None:
+                return
+
+        if not self.breaker.allow():
+            self._defer(room, built)
+            return
+
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            logger.warning("Channel layer not available")
+            return
+
+        group, message = built
+        message_type = message.get('type')
+        try:
+            with metrics.group_send_duration.time(message_type):
+                self._send(channel_layer.group_send(group, message))
+        except Exception as e:
+            self.breaker.record_failure()
+            metrics.group_send_total.inc(message_type, 'error')
+            logger.error(f"Error broadcasting to {group}: {e}")
+            self._defer(room, built)
+        else:
+            self.breaker.record_success()
+            self._unsent.pop(room, None)
+            metrics.group_send_total.inc(message_type, 'ok')
+
+    def _defer(self, room, built):
+        """보내지 못한 메시지를 기억하고 브레이커가 시험 전송을 허용할 때 다시 시도"""
+        self._unsent[room] = built
+        retry_at = self.breaker.retry_at() or time.monotonic() + self.interval
+        with self._cond:
+            self._schedule(room, retry_at)
+
+    def _retry_build(self, room):
+        """메시지를 만들지 못한 방을 버리지 않고 backoff 후 다시 예약"""
+        failures = self._build_failures.get(room, 0) + 1
+        self._build_failures[room] = failures
+        delay = min(max(self.interval, BUILD_RETRY_BASE) * 2 ** (failures - 1), BUILD_RETRY_MAX)
+        with self._cond:
+            self._schedule(room, time.monotonic() + delay)
+
+    def _send(self, coroutine):
+        loop = self._server_loop
+        if loop is not None and loop.is_running():
+            future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+            try:
+                future.result(self.send_timeout)
+            except Exception:
+                future.cancel()
+                raise
+        else:
+            self._loop.run_until_complete(coroutine)
@@ -1,12 +1,192 @@
+import asyncio
 import json
+import random
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from .models import Question, Vote
+from django.conf import settings
+from .models import Question
+from . import votes
+from .stats import EMPTY_STATS, get_vote_stats
+from . import rooms
+from . import metrics
+from . import presence
+from .signals import broadcast_presence
 import logging
 
 logger = logging.getLogger(__name__)
 
-class VoteConsumer(AsyncWebsocketConsumer):
+def requested_version(value):
+    """클라이언트가 마지막으로 받은 통계 버전 (없거나 잘못된 값이면 None)"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def query_version(scope):
+    """WebSocket URL의 ?v= 값 (재접속한 클라이언트가 마지막으로 받은 버전)"""
+    values = parse_qs(scope.get('query_string', b'').decode('latin1')).get('v')
+    return requested_version(values[0]) if values else None
+
+def wants_acks(scope):
+    """클라이언트가 통계 프레임마다 ack를 보내는지 (?ack=1, 받은 프레임 처리를 마쳤다는 신호)"""
+    return parse_qs(scope.get('query_string', b'').decode('latin1')).get('ack') == ['1']
+
+def is_presenter(scope):
+    """발표자 화면(QR 페이지)의 연결인지 (?role=presenter, 접속자 수에서 제외)"""
+    return parse_qs(scope.get('query_string', b'').decode('latin1')).get('role') == ['presenter']
+
+# 버린 프레임에 델타가 있어 이어 붙일 수 없음 (보낼 때 방의 최신 스냅샷으로 대신함)
+STALE = object()
+
+class LatestStatsMixin:
+    """소켓당 최신 통계 프레임 하나만 대기시키는 전송 (latest-value-wins)
+
+    그룹 핸들러는 프레임을 한 칸짜리 슬롯에 넣기만 하므로 채널 레이어의 채널 대기열은
+    바로 비워진다. 이전 프레임이 아직 끝나지 않았을 때 새 프레임이 오면 대기 중인 프레임을
+    버리고(드롭) 새 것으로 교체하며, 버린 프레임 때문에 델타를 이어 붙일 수 없으면
+    보낼 때 방의 최신 전체 스냅샷을 대신 보낸다. 통계는 멱등 스냅샷이므로 중간 값은
+    건너뛰어도 된다.
+
+    daphne의 send는 전송 버퍼에 넣고 바로 반환하고 ASGI로는 쓰기 버퍼를 볼 수 없으므로,
+    ?ack=1로 접속한 클라이언트는 받은 프레임을 처리한 뒤 {"type": "ack", "v": 버전}을 보내고
+    그 ack(최대 VOTE_STATS_ACK_TIMEOUT 초)가 올 때까지를 "이전 프레임이 끝나지 않음"으로 본다.
+    네트워크나 브라우저가 밀리면 ack가 늦어지고 그동안 온 프레임은 합쳐진다.
+    ack를 보내지 않는 클라이언트는 send가 끝나면 다음 프레임을 보낸다.
+    """
+    stats_type = None  # 'vote_stats' 또는 'short_answer_stats'
+    question_type = None  # 메트릭 레이블 ('OX' 또는 'SHORT_ANSWER')
+
+    def start_stats_sender(self):
+        metrics.websocket_connections.inc(self.question_type)
+        self.dropped_frames = 0
+        self._pending_frame = None
+        self._frame_ready = asyncio.Event()
+        self._acks = wants_acks(self.scope)
+        self._acked_version = None
+        self._ack_received = asyncio.Event()
+        self._sender = asyncio.ensure_future(self._send_latest_frames())
+
+    def stop_stats_sender(self):
+        sender = getattr(self, '_sender', None)
+        if sender is None:
+            return
+        sender.cancel()
+        self._sender = None
+        metrics.websocket_connections.dec(self.question_type)
+        if self.dropped_frames:
+            logger.info(
+                f"Question {self.question_id}: skipped {self.dropped_frames} stale stats frames "
+                f"for slow client {self.channel_name}"
+            )
+
+    def queue_stats_frame(self, event):
+        """그룹 이벤트의 프레임을 슬롯에 넣음 (대기 중인 프레임이 있으면 교체)"""
+        if self._pending_frame is None:
+            self._pending_frame = (event.get('version'), event['text'])
+        else:
+            self.dropped_frames += 1
+            metrics.stats_frames_dropped.inc(self.question_type)
+            self._pending_frame = STALE if event.get('delta') else (event.get('version'), event['text'])
+        self._frame_ready.set()
+
+    def receive_ack(self, version):
+        """클라이언트가 처리를 마친 통계 버전 기록 (보내는 중인 프레임의 ack면 다음 프레임 전송)"""
+        version = requested_version(version)
+        if version is None:
+            return
+        if self._acked_version is None or version > self._acked_version:
+            self._acked_version = version
+        self._ack_received.set()
+
+    async def _wait_for_ack(self, version):
+        """클라이언트가 version 이후까지 처리했다고 알리거나 VOTE_STATS_ACK_TIMEOUT이 지날 때까지 대기"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + getattr(settings, 'VOTE_STATS_ACK_TIMEOUT', 5.0)
+        while self._acked_version is None or self._acked_version < version:
+            self._ack_received.clear()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._ack_received.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+    async def _send_latest_frames(self):
+        while True:
+            await self._frame_ready.wait()
+            self._frame_ready.clear()
+            frame, self._pending_frame = self._pending_frame, None
+            try:
+                if frame is STALE:
+                    snapshot = await rooms.aget_snapshot(self.stats_type, self.question_id)
+                    if snapshot is None:
+                        continue
+                    frame = (snapshot.version, snapshot.text)
+                version, text = frame
+                await self.send(text_data=text)
+                if self._acks and version is not None:
+                    await self._wait_for_ack(version)
+            except Exception as e:
+                logger.error(f"Error sending stats frame: {e}")
+                return
+
+class PresenceMixin:
+    """방 접속자 수 (voting.presence)
+
+    참여자 연결은 접속하면 현재 버킷에 기록하고 이후 버킷마다 한 번 다시 기록한다.
+    접속/종료/하트비트마다 브로드캐스트를 요청하지만 디스패처가 방 단위로 합치고
+    수가 바뀐 경우에만 보낸다. 접속자 수 프레임은 발표자 연결만 모인 presence_{id}
+    그룹으로 보내므로 참여자 소켓 수만큼 퍼지지 않으며, 발표자 연결은 세지 않는다.
+    """
+
+    async def start_presence(self):
+        self._heartbeat = None
+        self._presenter = is_presenter(self.scope)
+        if self._presenter:
+            await self.channel_layer.group_add(presence.group_name(self.question_id), self.channel_name)
+            # 캐시만 읽으므로 DB 작업이 줄 서는 공용 스레드를 거치지 않음
+            viewers = await sync_to_async(presence.count, thread_sensitive=False)(self.question_id)
+            await self.send(text_data=presence.presence_frame(viewers))
+            return
+        self._presence_buckets = []
+        self._touch_presence()
+        self._heartbeat = asyncio.ensure_future(self._presence_heartbeat())
+
+    async def stop_presence(self):
+        if getattr(self, '_presenter', False):
+            await self.channel_layer.group_discard(presence.group_name(self.question_id), self.channel_name)
+            return
+        heartbeat = getattr(self, '_heartbeat', None)
+        if heartbeat is None:
+            return
+        heartbeat.cancel()
+        self._heartbeat = None
+        presence.leave(self.question_id, self._presence_buckets)
+        broadcast_presence(self.question_id)
+
+    def _touch_presence(self):
+        bucket = presence.join(self.question_id)
+        # 접속자 수는 직전/현재 버킷에서만 읽으므로 최근 두 버킷만 기억하면 됨
+        self._presence_buckets = (self._presence_buckets + [bucket])[-2:]
+        broadcast_presence(self.question_id)
+
+    async def _presence_heartbeat(self):
+        jitter = presence.heartbeat_interval() * presence.JITTER_RATIO
+        while True:
+            await asyncio.sleep(presence.seconds_until_next_bucket() + random.uniform(0, jitter))
+            self._touch_presence()
+
+    async def presence(self, event):
+        """방 접속자 수 변경 (발표자 연결만 받음)"""
+        await self.send(text_data=event['text'])
+
+class VoteConsumer(PresenceMixin, LatestStatsMixin, AsyncWebsocketConsumer):
+    stats_type = 'vote_stats'
+    question_type = 'OX'
+
     async def connect(self):
         self.question_id = self.scope['url_route']['kwargs']['question_id']
         self.room_group_name = f'vote_{self.question_id}'
@@ -19,14 +199,14 @@ class VoteConsumer(AsyncWebsocketConsumer):
 
         await self.accept()
         
-        # Send initial stats when connected
-        stats = await self.get_vote_stats()
-        await self.send(text_data=json.dumps({
-            'type': 'vote_stats',
-            'data': stats
-        }))
+        # 처음 접속이면 전체 스냅샷, 재접속(?v=)이면 놓친 델타만 전송
+        await self.send_stats(query_version(self.scope))
+        self.start_stats_sender()
+        await self.start_presence()
 
     async def disconnect(self, close_code):
+        self.stop_stats_sender()
+        await self.stop_presence()
         # Leave room group
         await self.channel_layer.group_discard(
             self.room_group_name,
@@ -40,23 +220,24 @@ class VoteConsumer(AsyncWebsocketConsumer):
 
             if message_type == 'get_stats':
                 # Send current stats
-                stats = await self.get_vote_stats()
-                await self.send(text_data=json.dumps({
-                    'type': 'vote_stats',
-                    'data': stats
-                }))
+                await self.send_stats()
+            elif message_type == 'ack':
+                self.receive_ack(text_data_json.get('v'))
+            elif message_type == 'resume':
+                # 중간 버전을 놓친 클라이언트에게 그 이후 프레임만 전송
+                await self.send_stats(requested_version(text_data_json.get('v')))
             elif message_type == 'toggle_results':
                 # Toggle results visibility
-                result = await self.toggle_question_results()
-                if result:
-                    # Broadcast to all connected clients
-                    await self.channel_layer.group_send(
-                        self.room_group_name,
-                        {
-                            'type': 'vote_stats',
-                            'data': result
-                        }
-                    )
+                # (question_updated 시그널이 커밋 후 모든 클라이언트에 한 번 브로드캐스트)
+                await self.toggle_question_results()
+            elif message_type == 'cast_vote':
+                # 이미 열린 소켓으로 투표 (HTTP POST/리다이렉트/결과 페이지 렌더링 생략)
+                status, stats = await self.cast_vote(text_data_json.get('choice'))
+                await self.send(text_data=json.dumps({
+                    'type': 'vote_result',
+                    'status': status,
+                    'data': stats.as_dict()
+                }))
         except Exception as e:
             logger.error(f"Error in WebSocket receive: {e}")
             await self.send(text_data=json.dumps({
@@ -66,47 +247,98 @@ class VoteConsumer(AsyncWebsocketConsumer):
 
     # Receive message from room group
     async def vote_stats(self, event):
-        # Send message to WebSocket
-        await self.send(text_data=json.dumps({
-            'type': 'vote_stats',
-            'data': event['data']
-        }))
-
-    @database_sync_to_async
-    def get_vote_stats(self):
+        # 브로드캐스터가 한 번 직렬화한 프레임을 그대로 전달 (느린 클라이언트에게는 최신 것만)
+        self.queue_stats_frame(event)
+
+    async def short_answer_stats(self, event):
+        # 같은 vote_{id} 그룹의 단답형 메시지는 O/X 화면에서 무시
+        pass
+
+    async def send_stats(self, since=None):
+        # 방의 마지막 스냅샷과 델타 기록에서 전송 (접속 폭주 시에도 DB를 조회하지 않음)
+        for frame in await rooms.aresume('vote_stats', self.question_id, since):
+            await self.send(text_data=frame.text)
+
+    async def get_vote_stats(self):
+        snapshot = await rooms.aget_snapshot('vote_stats', self.question_id)
+        return snapshot.stats if snapshot else EMPTY_STATS
+
+    async def cast_vote(self, choice):
+        """투표 기록 후 (결과 상태, 최신 통계) 반환"""
+        if choice not in votes.VALID_CHOICES:
+            return 'invalid', await self.get_vote_stats()
+        
+        if not await Question.objects.filter(id=self.question_id, is_active=True, question_type='OX').aexists():
+            return 'inactive', await self.get_vote_stats()
+        
+        fingerprint = votes.fingerprint_from_scope(self.scope)
+        created = await votes.acast_vote(self.question_id, fingerprint, choice)
+        status = 'created' if created else 'already_voted'
+        # 방금 기록한 투표가 반영된 통계여야 하므로 합쳐진 조회를 쓰지 않음
+        return status, await database_sync_to_async(get_vote_stats)(self.question_id) or EMPTY_STATS
+
+    async def toggle_question_results(self):
         try:
-            question = Question.objects.get(id=self.question_id)
-            return {
-                'show_results': question.show_results,
-                'o_percentage': question.o_percentage,
-                'x_percentage': question.x_percentage,
-                'total_votes': question.total_votes,
-                'o_votes': question.o_votes,
-                'x_votes': question.x_votes,
-            }
+            question = await Question.objects.aget(id=self.question_id)
         except Question.DoesNotExist:
-            return {
-                'show_results': False,
-                'o_percentage': 0,
-                'x_percentage': 0,
-                'total_votes': 0,
-                'o_votes': 0,
-                'x_votes': 0,
-            }
-
-    @database_sync_to_async
-    def toggle_question_results(self):
+            return False
+        question.show_results = not question.show_results
+        await question.asave(update_fields=['show_results'])
+        return True
+
+
+class ShortAnswerConsumer(PresenceMixin, LatestStatsMixin, AsyncWebsocketConsumer):
+    """단답형 워드클라우드 실시간 푸시 (VoteConsumer와 같은 vote_{id} 그룹 사용)"""
+    stats_type = 'short_answer_stats'
+    question_type = 'SHORT_ANSWER'
+
+    async def connect(self):
+        self.question_id = self.scope['url_route']['kwargs']['question_id']
+        self.room_group_name = f'vote_{self.question_id}'
+
+        await self.channel_layer.group_add(
+            self.room_group_name,
+            self.channel_name
+        )
+
+        await self.accept()
+
+        # 연결 시 현재 워드클라우드 데이터 전송 (재접속(?v=)이고 바뀐 것이 없으면 생략)
+        await self.send_stats(query_version(self.scope))
+        self.start_stats_sender()
+        await self.start_presence()
+
+    async def disconnect(self, close_code):
+        self.stop_stats_sender()
+        await self.stop_presence()
+        await self.channel_layer.group_discard(
+            self.room_group_name,
+            self.channel_name
+        )
+
+    async def receive(self, text_data):
         try:
-            question = Question.objects.get(id=self.question_id)
-            question.show_results = not question.show_results
-            question.save()
-            return {
-                'show_results': question.show_results,
-                'o_percentage': question.o_percentage,
-                'x_percentage': question.x_percentage,
-                'total_votes': question.total_votes,
-                'o_votes': question.o_votes,
-                'x_votes': question.x_votes,
-            }
-        except Question.DoesNotExist:
-            return None 
\ No newline at end of file
+            text_data_json = json.loads(text_data)
+            message_type = text_data_json.get('type')
+            if message_type == 'get_stats':
+                await self.send_stats()
+            elif message_type == 'ack':
+                self.receive_ack(text_data_json.get('v'))
+        except Exception as e:
+            logger.error(f"Error in WebSocket receive: {e}")
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'An error occurred'
+            }))
+
+    async def short_answer_stats(self, event):
+        # 브로드캐스터가 한 번 직렬화한 프레임을 그대로 전달 (느린 클라이언트에게는 최신 것만)
+        self.queue_stats_frame(event)
+
+    async def vote_stats(self, event):
+        # O/X 통계 메시지는 단답형 화면에서 무시
+        pass
+
+    async def send_stats(self, since=None):
+        for frame in await rooms.aresume('short_answer_stats', self.question_id, since):
+            await self.send(text_data=frame.text)
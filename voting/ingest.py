@@ -0,0 +1,208 @@
+"""투표 write-behind 버퍼 (VOTE_INGEST_MODE = 'buffered'일 때 사용)
+
+교실 전체가 동시에 투표하면 요청마다 Vote INSERT가 SQLite 쓰기 잠금을
+잡기 위해 줄을 선다. 버퍼 모드에서는 투표를 (question, client_fingerprint)
+기준으로 중복 제거해 메모리에 받아 두고 바로 응답하며, 전용 스레드가
+flush_interval마다 bulk_create(ignore_conflicts=True) 한 번으로 저장한 뒤
+질문별 득표수를 새로 저장된 표만큼 F()로 올린다.
+
+받은 투표는 응답하기 전에 저널 파일(VOTE_INGEST_JOURNAL)에 한 줄씩 추가하고, 저장이
+끝난 투표는 flush 후 저널에서 지운다. 프로세스가 강제 종료되어도 저장되지 않은 투표는
+저널에 남아 있다가 다음 프로세스가 버퍼를 처음 쓸 때 다시 불러와 저장한다 (이미
+저장된 투표는 건너뜀). 저널은 fsync하지 않으므로 서버(OS) 자체가 멈추면 마지막
+투표가 유실될 수 있으며, 프로세스마다 다른 경로를 써야 한다. 저장에 실패한 배치는
+버퍼로 되돌려 다음 flush에서 다시 시도한다.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+import logging
+from django.conf import settings
+from django.db import transaction, close_old_connections
+from .models import Question, Vote
+from .signals import broadcast_vote_stats
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def buffer_key(question_id, fingerprint):
+    # URL의 질문 id 문자열과 UUID 객체가 같은 키가 되도록 정규화
+    return str(uuid.UUID(str(question_id))), fingerprint
+
+
+class VoteBuffer:
+    def __init__(self, flush_interval=0.1, max_batch=1000, journal_path=None):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.journal_path = journal_path
+        self._lock = threading.Lock()
+        self._pending = {}  # (question_id, client_fingerprint) -> choice
+        self._journal = None  # 저널 파일 디스크립터 (O_APPEND)
+        self._recovered = False
+        self._thread = None
+        # 정상 종료 시 남은 투표 저장
+        atexit.register(self._flush_at_exit)
+
+    def submit(self, question_id, fingerprint, choice):
+        """투표를 저널과 버퍼에 추가 (이미 버퍼에 있으면 False)"""
+        key = buffer_key(question_id, fingerprint)
+        with self._lock:
+            self._recover()
+            if key in self._pending:
+                return False
+            self._write_journal([(key, choice)])
+            self._pending[key] = choice
+            self._ensure_worker()
+        return True
+
+    def _flush_at_exit(self):
+        # 이 프로세스에서 버퍼를 쓰지 않았으면 저널을 건드리지 않음
+        if self._recovered:
+            self.flush()
+
+    def contains(self, question_id, fingerprint):
+        """아직 저장되지 않은 투표가 버퍼에 있는지 확인"""
+        if not self._recovered:
+            with self._lock:
+                self._recover()
+        return buffer_key(question_id, fingerprint) in self._pending
+
+    def _recover(self):
+        """이전 프로세스가 저장하지 못하고 저널에 남긴 투표를 버퍼로 불러옴 (self._lock 보유 상태)"""
+        if self._recovered:
+            return
+        self._recovered = True
+        if not self.journal_path:
+            return
+        recovered = 0
+        try:
+            with open(self.journal_path, encoding='utf-8') as journal:
+                for line in journal:
+                    try:
+                        question_id, fingerprint, choice = json.loads(line)
+                    except ValueError:
+                        # 쓰는 도중 종료되어 잘린 마지막 줄
+                        continue
+                    self._pending.setdefault((question_id, fingerprint), choice)
+                    recovered += 1
+        except FileNotFoundError:
+            pass
+        self._journal = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        if recovered:
+            logger.warning(f"Recovered {recovered} unsaved votes from {self.journal_path}")
+            self._ensure_worker()
+
+    def _write_journal(self, entries):
+        if self._journal is None:
+            return
+        lines = ''.join(
+            json.dumps([question_id, fingerprint, choice]) + '\n'
+            for (question_id, fingerprint), choice in entries
+        )
+        os.write(self._journal, lines.encode())
+
+    def _compact_journal(self):
+        """저장된 투표를 저널에서 지움 (남은 버퍼 투표만 다시 기록, self._lock 보유 상태)"""
+        if self._journal is None:
+            return
+        os.ftruncate(self._journal, 0)
+        self._write_journal(self._pending.items())
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='vote-ingest', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing vote buffer: {e}")
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """버퍼의 투표를 한 번에 저장하고 질문별 득표수 갱신 (새로 저장된 표 수 반환)"""
+        with self._lock:
+            self._recover()
+            if not self._pending:
+                return 0
+            if len(self._pending) <= self.max_batch:
+                batch, self._pending = self._pending, {}
+            else:
+                keys = list(self._pending)[:self.max_batch]
+                batch = {key: self._pending.pop(key) for key in keys}
+
+        try:
+            saved = self._save(batch)
+        except Exception:
+            # 저장하지 못한 배치는 버퍼로 되돌림 (저널에도 남아 있음), 다음 flush에서 다시 시도
+            with self._lock:
+                for key, choice in batch.items():
+                    self._pending.setdefault(key, choice)
+            raise
+
+        with self._lock:
+            self._compact_journal()
+
+        touched = {question_id for question_id, _ in saved}
+        for question_id in touched:
+            broadcast_vote_stats(question_id)
+        for choice in saved.values():
+            metrics.votes_ingested.inc(choice)
+
+        logger.info(f"Flushed {len(saved)} buffered votes for {len(touched)} questions")
+        return len(saved)
+
+    def _save(self, batch):
+        """배치를 한 트랜잭션으로 저장하고 새로 저장된 {(question_id, fingerprint): choice} 반환"""
+        touched = {question_id for question_id, _ in batch}
+        with transaction.atomic():
+            # 버퍼에 있는 동안 삭제된 질문의 투표는 버림 (FOREIGN KEY 오류로 배치 전체가 실패하지 않도록)
+            live = {str(question_id) for question_id in Question.objects.filter(id__in=touched).values_list('id', flat=True)}
+            if touched - live:
+                logger.warning(f"Dropping buffered votes for deleted questions: {sorted(touched - live)}")
+            rows = {key: choice for key, choice in batch.items() if key[0] in live}
+            if not rows:
+                return {}
+
+            # 이미 저장된 투표 (다른 프로세스의 투표, 저널 정리 전에 종료되어 다시 불러온 투표)는 건너뜀
+            existing = {
+                (str(question_id), fingerprint) for question_id, fingerprint in Vote.objects.filter(
+                    question_id__in=live,
+                    client_fingerprint__in={fingerprint for _, fingerprint in rows},
+                ).values_list('question_id', 'client_fingerprint')
+            }
+            saved = {key: choice for key, choice in rows.items() if key not in existing}
+            Vote.objects.bulk_create(
+                [
+                    Vote(question_id=question_id, client_fingerprint=fingerprint, choice=choice)
+                    for (question_id, fingerprint), choice in saved.items()
+                ],
+                ignore_conflicts=True,
+            )
+
+            # bulk_create는 post_save 시그널을 보내지 않으므로 새로 저장한 표만큼 득표수를 올림
+            tallies = {}
+            for (question_id, _), choice in saved.items():
+                o_votes, x_votes = tallies.get(question_id, (0, 0))
+                tallies[question_id] = (o_votes + (choice == 'O'), x_votes + (choice == 'X'))
+            for question_id, (o_votes, x_votes) in tallies.items():
+                Question.add_votes(question_id, o_votes, x_votes)
+        return saved
+
+
+def is_buffered():
+    return getattr(settings, 'VOTE_INGEST_MODE', 'direct') == 'buffered'
+
+
+vote_buffer = VoteBuffer(
+    flush_interval=getattr(settings, 'VOTE_INGEST_FLUSH_MS', 100) / 1000,
+    journal_path=getattr(settings, 'VOTE_INGEST_JOURNAL', ''),
+)
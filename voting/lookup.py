@@ -0,0 +1,43 @@
+"""간단 코드 → 질문 조회 캐시 (read-through)"""
+from collections import namedtuple
+from django.core.cache import cache
+from .models import Question
+
+QuestionRef = namedtuple('QuestionRef', ['id', 'question_type', 'is_active', 'show_results'])
+
+CACHE_TIMEOUT = 300  # 초
+NOT_FOUND = ()  # 존재하지 않는 코드도 캐시 (새 질문 저장 시 무효화됨)
+
+def cache_key(simple_code):
+    return f'question_code:{simple_code}'
+
+def get_question_ref(simple_code):
+    """간단 코드로 질문 요약 정보 조회 (없으면 None)
+
+    같은 코드를 예전 비활성 질문이 쓰고 있을 수 있으므로 활성 질문, 최신 질문 순으로 고른다.
+    """
+    key = cache_key(simple_code)
+    ref = cache.get(key)
+    if ref is None:
+        row = Question.objects.filter(simple_code=simple_code).order_by(
+            '-is_active', '-created_at'
+        ).values_list('id', 'question_type', 'is_active', 'show_results').first()
+        ref = row or NOT_FOUND
+        cache.set(key, ref, CACHE_TIMEOUT)
+    return QuestionRef(*ref) if ref else None
+
+async def aget_question_ref(simple_code):
+    """get_question_ref의 비동기 버전 (비동기 캐시와 비동기 ORM 사용)"""
+    key = cache_key(simple_code)
+    ref = await cache.aget(key)
+    if ref is None:
+        row = await Question.objects.filter(simple_code=simple_code).order_by(
+            '-is_active', '-created_at'
+        ).values_list('id', 'question_type', 'is_active', 'show_results').afirst()
+        ref = row or NOT_FOUND
+        await cache.aset(key, ref, CACHE_TIMEOUT)
+    return QuestionRef(*ref) if ref else None
+
+def invalidate(simple_codes):
+    """간단 코드 캐시 무효화"""
+    cache.delete_many([cache_key(code) for code in simple_codes if code])
@@ -0,0 +1,55 @@
+import asyncio
+import json
+import time
+from django.core.management.base import BaseCommand
+from voting.bench import bench_environment, summarize_ms
+
+class Command(BaseCommand):
+    help = 'N개의 WebSocket이 동시에 접속할 때 첫 통계 수신까지의 지연 시간을 측정합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--connections',
+            type=int,
+            default=500,
+            help='동시 접속 수 (기본값: 500)'
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=3,
+            help='반복 횟수 (기본값: 3)'
+        )
+
+    def handle(self, *args, **options):
+        with bench_environment():
+            from voting.models import Question
+            question = Question.objects.create(text='벤치마크 질문')
+            results = [
+                asyncio.run(self.storm(question.id, options['connections']))
+                for _ in range(options['rounds'])
+            ]
+
+        latencies = [latency for result in results for latency in result]
+        self.stdout.write(json.dumps({
+            'benchmark': 'connect_storm',
+            'connections': options['connections'],
+            'rounds': options['rounds'],
+            'first_stats_latency': summarize_ms(latencies),
+        }, indent=2))
+
+    async def storm(self, question_id, connections):
+        from channels.testing import WebsocketCommunicator
+        from oxvote.asgi import application
+
+        async def connect_one():
+            communicator = WebsocketCommunicator(application, f'/ws/vote/{question_id}/', headers=[(b'origin', b'https://localhost')])
+            started = time.perf_counter()
+            await communicator.connect(timeout=60)
+            await communicator.receive_from(timeout=60)
+            latency = time.perf_counter() - started
+            return communicator, latency
+
+        pairs = await asyncio.gather(*(connect_one() for _ in range(connections)))
+        await asyncio.gather(*(communicator.disconnect(timeout=60) for communicator, _ in pairs))
+        return [latency for _, latency in pairs]
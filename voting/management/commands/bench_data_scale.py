@@ -0,0 +1,140 @@
+import json
+import time
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from voting.bench import bench_environment, summarize_ms
+
+BATCH_SIZE = 5000
+STALE_QUESTIONS = 10  # 정리 명령을 실행할 때마다 비활성화 대상이 되는 질문 수
+
+
+def measure(fn, repeat, setup=None):
+    """fn을 repeat번 실행한 시간 요약과 1회당 쿼리 수 (setup은 측정에서 제외)"""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+    return {**summarize_ms(timings), 'queries': len(queries)}
+
+
+class Command(BaseCommand):
+    help = '투표/응답 행 수(10^3~10^6)에 따라 통계 조회, 코드 조회, 비활성 질문 정리 시간이 어떻게 늘어나는지 측정합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 100000],
+            help='질문 하나에 넣을 Vote/ShortAnswerResponse 행 수 (기본값: 1000 10000 100000, 10^6은 직접 지정)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='경로마다 반복 측정 횟수 (기본값: 50)'
+        )
+        parser.add_argument(
+            '--words',
+            type=int,
+            default=1000,
+            help='단답형 응답의 서로 다른 단어 수 (기본값: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        results = []
+        for size in options['sizes']:
+            # 크기마다 새 DB에서 측정 (이전 크기의 행이 섞이지 않게)
+            with bench_environment():
+                started = time.perf_counter()
+                questions = self.seed(size, options['words'])
+                seed_seconds = time.perf_counter() - started
+                results.append({
+                    'rows': size,
+                    'seed_s': round(seed_seconds, 2),
+                    'paths': self.run_paths(questions, options['repeat']),
+                })
+
+        self.stdout.write(json.dumps({
+            'benchmark': 'data_scale',
+            'repeat': options['repeat'],
+            'words': options['words'],
+            'results': results,
+        }, indent=2))
+
+    def seed(self, size, words):
+        """O/X 질문에 size개 투표, 단답형 질문에 size개 응답, 같은 코드를 쓰던 과거 질문 size개를 넣음"""
+        from voting.models import Question, ShortAnswerResponse, Vote
+
+        ox = Question.objects.create(text='벤치마크 O/X 질문')
+        short_answer = Question.objects.create(text='벤치마크 단답형 질문', question_type='SHORT_ANSWER')
+        participants = max(1, size // 3)
+
+        with transaction.atomic():
+            Vote.objects.bulk_create(
+                (Vote(question=ox, choice='O' if i % 3 else 'X', client_fingerprint=f'{i:032x}')
+                 for i in range(size)),
+                batch_size=BATCH_SIZE,
+            )
+            ShortAnswerResponse.objects.bulk_create(
+                (ShortAnswerResponse(
+                    question=short_answer,
+                    response_text=f'응답{i % words}',
+                    client_fingerprint=f'{i % participants:032x}',
+                ) for i in range(size)),
+                batch_size=BATCH_SIZE,
+            )
+        # bulk_create는 시그널을 보내지 않으므로 카운터와 빈도 집계는 원본 데이터로 다시 계산
+        call_command('rebuild_tallies', stdout=StringIO())
+
+        # 코드가 재사용되는 운영 상황처럼 과거 비활성 질문들이 같은 코드들을 나눠 씀
+        long_ago = timezone.now() - timedelta(days=1)
+        with transaction.atomic():
+            Question.objects.bulk_create(
+                (Question(text='과거 질문', simple_code=f'{i % 10000:04d}', is_active=False, last_activity=long_ago)
+                 for i in range(size)),
+                batch_size=BATCH_SIZE,
+            )
+        stale = list(Question.objects.filter(is_active=False).values_list('id', flat=True)[:STALE_QUESTIONS])
+        return ox, short_answer, stale
+
+    def run_paths(self, questions, repeat):
+        from voting import lookup
+        from voting.models import Question
+        from voting.stats import get_short_answer_stats, get_vote_stats
+        from voting.views import get_question_by_code
+
+        ox, short_answer, stale = questions
+
+        def question_percentages():
+            question = Question.objects.get(id=ox.id)
+            return question.total_votes, question.o_percentage
+
+        def mark_stale():
+            Question.objects.filter(id__in=stale).update(
+                is_active=True, last_activity=timezone.now() - timedelta(days=1)
+            )
+
+        return {
+            'question_total_votes': measure(question_percentages, repeat),
+            'get_vote_stats': measure(lambda: get_vote_stats(ox.id), repeat),
+            'get_short_answer_stats': measure(lambda: get_short_answer_stats(short_answer.id), repeat),
+            'get_question_by_code_cold': measure(
+                lambda: get_question_by_code(ox.simple_code), repeat,
+                setup=lambda: lookup.invalidate([ox.simple_code]),
+            ),
+            'get_question_by_code_cached': measure(lambda: get_question_by_code(ox.simple_code), repeat),
+            'cleanup_inactive_questions': measure(
+                lambda: call_command('cleanup_inactive_questions', stdout=StringIO()), repeat,
+                setup=mark_stale,
+            ),
+        }
@@ -0,0 +1,69 @@
+import asyncio
+import json
+import time
+from django.core.management.base import BaseCommand
+from voting.bench import bench_environment, summarize_ms
+
+class Command(BaseCommand):
+    help = '한 방의 WebSocket 수에 따라 브로드캐스트 한 번을 모두에게 전달하는 데 드는 CPU 시간을 측정합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10, 100, 1000],
+            help='측정할 방 인원 (기본값: 10 100 1000)'
+        )
+        parser.add_argument(
+            '--broadcasts',
+            type=int,
+            default=50,
+            help='방 인원마다 보낼 브로드캐스트 수 (기본값: 50)'
+        )
+
+    def handle(self, *args, **options):
+        results = []
+        with bench_environment():
+            from voting.models import Question
+            from voting.signals import build_room_message
+            for size in options['sizes']:
+                question = Question.objects.create(text='벤치마크 질문')
+                group, message = build_room_message(('vote_stats', str(question.id)))
+                results.append(asyncio.run(self.fanout(question.id, group, message, size, options['broadcasts'])))
+
+        self.stdout.write(json.dumps({
+            'benchmark': 'fanout',
+            'broadcasts': options['broadcasts'],
+            'results': results,
+        }, indent=2))
+
+    async def fanout(self, question_id, group, message, size, broadcasts):
+        from channels.layers import get_channel_layer
+        from channels.testing import WebsocketCommunicator
+        from oxvote.asgi import application
+
+        async def connect_one():
+            communicator = WebsocketCommunicator(application, f'/ws/vote/{question_id}/', headers=[(b'origin', b'https://localhost')])
+            await communicator.connect(timeout=60)
+            await communicator.receive_from(timeout=60)
+            return communicator
+
+        communicators = await asyncio.gather(*(connect_one() for _ in range(size)))
+        channel_layer = get_channel_layer()
+
+        cpu_times, wall_times = [], []
+        for _ in range(broadcasts):
+            cpu_started, wall_started = time.process_time(), time.perf_counter()
+            await channel_layer.group_send(group, message)
+            await asyncio.gather(*(communicator.receive_from(timeout=60) for communicator in communicators))
+            cpu_times.append(time.process_time() - cpu_started)
+            wall_times.append(time.perf_counter() - wall_started)
+
+        await asyncio.gather(*(communicator.disconnect(timeout=60) for communicator in communicators))
+        return {
+            'sockets': size,
+            'cpu_per_broadcast': summarize_ms(cpu_times),
+            'delivery': summarize_ms(wall_times),
+            'cpu_per_socket_us': round(sum(cpu_times) / broadcasts / size * 1e6, 2),
+        }
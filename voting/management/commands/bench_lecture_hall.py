@@ -0,0 +1,148 @@
+import asyncio
+import json
+import re
+import time
+from django.core.management.base import BaseCommand
+from voting.bench import QueryCounter, bench_environment, summarize_ms
+
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class PhoneTally:
+    """휴대폰 한 대가 WebSocket 프레임으로 알고 있는 O/X 집계 (qr_page.html의 applyStatsMessage와 같은 규칙)"""
+
+    def __init__(self):
+        self.version = None
+        self.o_votes = 0
+        self.x_votes = 0
+
+    @property
+    def total_votes(self):
+        return self.o_votes + self.x_votes
+
+    def apply(self, frame):
+        """프레임 반영 (버전이 빠져 이어 받을 수 없으면 False)"""
+        version = frame.get('v')
+        if frame['type'] == 'vote_stats':
+            if self.version is None or version >= self.version:
+                self.version = version
+                self.o_votes = frame['data']['o_votes']
+                self.x_votes = frame['data']['x_votes']
+            return True
+        if frame['type'] == 'vote_delta':
+            if self.version is None or version > self.version + 1:
+                return False
+            if version == self.version + 1:
+                self.version = version
+                self.o_votes += frame.get('o', 0)
+                self.x_votes += frame.get('x', 0)
+        return True
+
+
+class Command(BaseCommand):
+    help = '강의실 시뮬레이션: N대의 휴대폰이 WebSocket으로 접속한 채 동시에 투표할 때의 지연 시간과 쿼리 수를 측정합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--phones',
+            type=int,
+            default=200,
+            help='휴대폰(투표자) 수 (기본값: 200)'
+        )
+        parser.add_argument(
+            '--ingest',
+            choices=['direct', 'buffered'],
+            default='direct',
+            help='투표 저장 방식 VOTE_INGEST_MODE (기본값: direct)'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='최종 집계를 기다릴 최대 시간(초) (기본값: 60)'
+        )
+
+    def handle(self, *args, **options):
+        with bench_environment(VOTE_INGEST_MODE=options['ingest']), QueryCounter() as queries:
+            from voting.models import Question
+            question = Question.objects.create(text='벤치마크 질문')
+            result = asyncio.run(self.lecture_hall(question, options['phones'], options['timeout'], queries))
+
+        self.stdout.write(json.dumps({
+            'benchmark': 'lecture_hall',
+            'phones': options['phones'],
+            'ingest': options['ingest'],
+            **result,
+        }, indent=2))
+
+    async def lecture_hall(self, question, phones, timeout, queries):
+        from channels.testing import HttpCommunicator, WebsocketCommunicator
+        from oxvote.asgi import application
+
+        path = f'/{question.simple_code}/'
+
+        def headers(index, cookie=None):
+            # 휴대폰마다 다른 IP로 보이게 해 투표 지문(IP + User-Agent)이 겹치지 않게 함
+            pairs = [
+                (b'host', b'localhost'),
+                (b'origin', b'https://localhost'),
+                (b'x-forwarded-proto', b'https'),
+                (b'x-forwarded-for', f'10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}'.encode()),
+                (b'user-agent', b'bench-lecture-hall'),
+            ]
+            if cookie:
+                pairs.append((b'cookie', f'csrftoken={cookie}'.encode()))
+            return pairs
+
+        async def join(index):
+            """소켓을 열어 첫 통계를 받고, 투표 페이지에서 CSRF 토큰을 받아 둠"""
+            socket = WebsocketCommunicator(application, f'/ws/vote/{question.id}/', headers=[(b'origin', b'https://localhost')])
+            await socket.connect(timeout=timeout)
+            tally = PhoneTally()
+            tally.apply(json.loads(await socket.receive_from(timeout=timeout)))
+
+            response = await HttpCommunicator(application, 'GET', path, headers=headers(index)).get_response(timeout)
+            cookie = next(
+                value.decode().split(';')[0].split('=', 1)[1]
+                for name, value in response['headers']
+                if name.lower() == b'set-cookie' and value.startswith(b'csrftoken=')
+            )
+            token = CSRF_INPUT.search(response['body'].decode()).group(1)
+            return socket, tally, cookie, token
+
+        async def vote(index, cookie, token):
+            choice = 'O' if index % 3 else 'X'
+            body = f'choice={choice}&csrfmiddlewaretoken={token}'.encode()
+            request_headers = headers(index, cookie) + [(b'content-type', b'application/x-www-form-urlencoded')]
+            started = time.perf_counter()
+            response = await HttpCommunicator(application, 'POST', path, body, request_headers).get_response(timeout)
+            if response['status'] != 302:
+                raise RuntimeError(f"Vote failed with status {response['status']}")
+            return time.perf_counter() - started
+
+        async def watch(socket, tally, started):
+            """최종 집계(phones 표)를 볼 때까지 프레임을 받아 걸린 시간 반환"""
+            while tally.total_votes < phones:
+                frame = json.loads(await socket.receive_from(timeout=timeout))
+                if not tally.apply(frame):
+                    await socket.send_json_to({'type': 'resume', 'v': tally.version})
+            return time.perf_counter() - started
+
+        members = await asyncio.gather(*(join(index) for index in range(phones)))
+
+        before = queries.count
+        started = time.perf_counter()
+        watchers = [asyncio.ensure_future(watch(socket, tally, started)) for socket, tally, _, _ in members]
+        vote_latencies = await asyncio.gather(*(
+            vote(index, cookie, token) for index, (_, _, cookie, token) in enumerate(members)
+        ))
+        final_tally = await asyncio.gather(*watchers)
+        vote_queries = queries.count - before
+
+        await asyncio.gather(*(socket.disconnect(timeout=timeout) for socket, _, _, _ in members))
+        return {
+            'vote_latency': summarize_ms(vote_latencies),
+            'final_tally_ms': round(max(final_tally) * 1000, 3),
+            'final_tally_per_socket': summarize_ms(final_tally),
+            'queries_per_vote': round(vote_queries / phones, 2),
+        }
@@ -2,6 +2,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
 from voting.models import Question
+from voting.lookup import invalidate as invalidate_code_cache
 
 class Command(BaseCommand):
     help = '비활성 질문들을 정리합니다 (30분 이상 활동이 없는 질문들)'
@@ -48,14 +49,21 @@ class Command(BaseCommand):
                     f'(마지막 활동: {question.last_activity})'
                 )
         else:
-            # 실제로 비활성화
-            updated = inactive_questions.update(is_active=False)
+            # 비활성화 전에 대상 목록 확보 (update 후에는 is_active 필터에 걸리지 않음)
+            targets = list(inactive_questions.values_list('id', 'simple_code', 'text'))
+            
+            # 실제로 비활성화하고 간단한 코드를 풀로 반환하여 재사용 가능하도록 정리
+            # (그 사이 다른 요청이 먼저 종료한 질문은 건너뜀, 코드를 두 번 반환하지 않도록)
+            deactivated = [
+                (simple_code, text) for question_id, simple_code, text in targets
+                if Question.mark_inactive(question_id)
+            ]
             self.stdout.write(
-                self.style.SUCCESS(f'{updated}개의 질문을 비활성화했습니다.')
+                self.style.SUCCESS(f'{len(deactivated)}개의 질문을 비활성화했습니다.')
             )
             
-            # 비활성화된 질문들의 간단한 코드 재사용 가능하도록 정리
-            for question in inactive_questions:
+            invalidate_code_cache([simple_code for simple_code, _ in deactivated])
+            for simple_code, text in deactivated:
                 self.stdout.write(
-                    f'  - {question.simple_code}: {question.text[:50]}... 비활성화됨'
+                    f'  - {simple_code}: {text[:50]}... 비활성화됨'
                 )
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from voting.models import Question, ShortAnswerResponse, ShortAnswerWordCount
+
+class Command(BaseCommand):
+    help = '원본 데이터로 질문별 O/X 득표수와 단답형 응답 집계를 다시 계산합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='실제로 수정하지 않고 어긋난 카운터만 표시'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        # 질문별 실제 집계를 한 번의 집계 쿼리로 계산
+        tallies = Question.objects.annotate(
+            actual_o=Count('votes', filter=Q(votes__choice='O'), distinct=True),
+            actual_x=Count('votes', filter=Q(votes__choice='X'), distinct=True),
+            actual_responses=Count('short_answers', distinct=True),
+            actual_participants=Count('short_answers__client_fingerprint', distinct=True),
+        ).values_list(
+            'id', 'simple_code',
+            'o_count', 'x_count', 'response_count', 'participant_count',
+            'actual_o', 'actual_x', 'actual_responses', 'actual_participants',
+        )
+
+        fixed = 0
+        for question_id, simple_code, *stored, actual_o, actual_x, actual_responses, actual_participants in tallies:
+            actual = [actual_o, actual_x, actual_responses, actual_participants]
+            if stored == actual:
+                continue
+
+            fixed += 1
+            self.stdout.write(
+                f'  - {simple_code}: O {stored[0]} -> {actual_o}, X {stored[1]} -> {actual_x}, '
+                f'응답 {stored[2]} -> {actual_responses}, 참여자 {stored[3]} -> {actual_participants}'
+            )
+            if not dry_run:
+                Question.objects.filter(id=question_id).update(
+                    o_count=actual_o,
+                    x_count=actual_x,
+                    response_count=actual_responses,
+                    participant_count=actual_participants,
+                )
+
+        if not dry_run:
+            # 단답형 빈도 집계 테이블 재생성
+            with transaction.atomic():
+                ShortAnswerWordCount.objects.all().delete()
+                word_counts = ShortAnswerResponse.objects.values('question_id', 'response_text').annotate(
+                    count=Count('id')
+                )
+                ShortAnswerWordCount.objects.bulk_create(
+                    (ShortAnswerWordCount(**row) for row in word_counts.iterator()),
+                    batch_size=1000,
+                )
+
+        if fixed == 0:
+            self.stdout.write(self.style.SUCCESS('모든 질문 카운터가 정확합니다.'))
+        elif dry_run:
+            self.stdout.write(self.style.WARNING(f'[DRY RUN] {fixed}개의 질문 카운터가 어긋나 있습니다.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{fixed}개의 질문 카운터를 다시 계산했습니다.'))
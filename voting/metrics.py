@@ -0,0 +1,194 @@
+"""Prometheus 텍스트 형식 메트릭 (/metrics)
+
+외부 라이브러리 없이 프로세스 내 카운터/게이지/히스토그램을 유지한다. 기록은 락 안에서
+dict 값 하나를 바꾸는 것뿐이고, 텍스트 변환은 수집(scrape)할 때만 일어난다.
+값은 프로세스마다 따로 쌓이므로 여러 프로세스로 운영하면 프로세스별로 수집해야 한다.
+
+WebSocket 대신 폴링/SSE로 넘어간 클라이언트 수는 vote_stats, stats_events 등
+URL 이름별 요청 히스토그램의 _count로 볼 수 있다.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from django.db.backends.signals import connection_created
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+_registry = []
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # 레이블 값 튜플 -> 값
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def samples(self):
+        """(접미사, 레이블 값 튜플, 추가 레이블, 값) 목록"""
+        with self._lock:
+            return [('', labels, (), value) for labels, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for suffix, labels, extra, value in self.samples():
+            lines.append(
+                f'{self.name}{suffix}{format_labels(self.labelnames, labels, extra)} {format_value(value)}'
+            )
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # 구간별 개수 (마지막 칸은 +Inf), 합계
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self):
+        with self._lock:
+            states = [(labels, list(counts), total) for labels, (counts, total) in sorted(self._values.items())]
+        samples = []
+        for labels, counts, total in states:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                cumulative += count
+                samples.append(('_bucket', labels, (('le', format_value(bound)),), cumulative))
+            samples.append(('_sum', labels, (), total))
+            samples.append(('_count', labels, (), cumulative))
+        return samples
+
+
+def render():
+    """등록된 모든 메트릭의 Prometheus 텍스트"""
+    return '\n'.join(metric.render() for metric in _registry) + '\n'
+
+
+request_duration = Histogram(
+    'oxvote_http_request_duration_seconds', 'HTTP 요청 처리 시간 (URL 이름별)', ['view'],
+)
+request_queries = Histogram(
+    'oxvote_http_request_db_queries', '요청 하나가 실행한 DB 쿼리 수 (URL 이름별)', ['view'], buckets=QUERY_BUCKETS,
+)
+group_send_duration = Histogram(
+    'oxvote_group_send_duration_seconds', '브로드캐스트 group_send 시간', ['type'],
+)
+group_send_total = Counter(
+    'oxvote_group_send_total', '브로드캐스트 group_send 횟수 (result: ok, error)', ['type', 'result'],
+)
+broadcast_build_duration = Histogram(
+    'oxvote_broadcast_build_duration_seconds', '브로드캐스트할 통계 계산 시간', ['type'],
+)
+broadcast_build_errors = Counter(
+    'oxvote_broadcast_build_errors_total', '브로드캐스트 메시지 생성 실패 횟수 (backoff 후 재시도됨)',
+)
+websocket_connections = Gauge(
+    'oxvote_websocket_connections', '열려 있는 WebSocket 연결 수 (질문 유형별)', ['question_type'],
+)
+stats_frames_dropped = Counter(
+    'oxvote_stats_frames_dropped_total', '느린 WebSocket 클라이언트에게 보내지 않고 최신 프레임으로 교체한 통계 프레임 수',
+    ['question_type'],
+)
+votes_ingested = Counter(
+    'oxvote_votes_total', '저장된 O/X 투표 수', ['choice'],
+)
+short_answers_ingested = Counter(
+    'oxvote_short_answers_total', '저장된 단답형 응답 수',
+)
+
+
+# 진행 중인 요청의 쿼리 수 (sync_to_async 스레드에도 컨텍스트가 복사되므로 함께 셈)
+_request_queries = contextvars.ContextVar('request_queries', default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    counter = _request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+connection_created.connect(install_query_counter)
+
+
+@contextmanager
+def track_request(request):
+    """요청 처리 시간과 쿼리 수를 URL 이름별로 기록"""
+    counter = [0]
+    token = _request_queries.set(counter)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _request_queries.reset(token)
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match is not None and match.url_name else 'unresolved'
+        request_duration.observe(elapsed, view)
+        request_queries.observe(counter[0], view)
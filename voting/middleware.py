@@ -0,0 +1,78 @@
+"""프로젝트 공용 미들웨어"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from whitenoise.middleware import WhiteNoiseMiddleware
+from . import metrics
+from . import profiler
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """비동기 체인에서도 동작하는 WhiteNoise
+
+    WhiteNoise 6.x 미들웨어는 동기 전용이라 ASGI(daphne)에서는 그 뒤의 모든
+    미들웨어와 뷰가 스레드를 거쳐 실행된다. 정적 파일 조회는 메모리의 dict를
+    보는 것뿐이므로 이벤트 루프에서 처리하고, 나머지 요청은 그대로 넘긴다.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class MetricsMiddleware:
+    """URL 이름별 요청 처리 시간과 DB 쿼리 수 기록 (voting.metrics, 동기/비동기 체인 모두 지원)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with metrics.track_request(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with metrics.track_request(request):
+            return await self.get_response(request)
+
+
+class ProfilerMiddleware:
+    """voting 뷰 요청의 쿼리 수, DB/템플릿 시간 측정과 느린 요청 로그 (voting.profiler, REQUEST_PROFILER일 때만 설치)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        profiler.install()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with profiler.profile_request(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with profiler.profile_request(request):
+            return await self.get_response(request)
@@ -0,0 +1,37 @@
+# Generated manually
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_vote_tallies(apps, schema_editor):
+    """기존 투표 데이터로 득표수 카운터 채우기"""
+    Question = apps.get_model('voting', 'Question')
+    tallies = Question.objects.annotate(
+        o=Count('votes', filter=Q(votes__choice='O')),
+        x=Count('votes', filter=Q(votes__choice='X')),
+    ).values_list('id', 'o', 'x')
+    for question_id, o_count, x_count in tallies:
+        if o_count or x_count:
+            Question.objects.filter(id=question_id).update(o_count=o_count, x_count=x_count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0003_add_short_answer_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='o_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='O 득표수'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='x_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='X 득표수'),
+        ),
+        migrations.RunPython(backfill_vote_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated manually
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def backfill_short_answer_counts(apps, schema_editor):
+    """기존 단답형 응답으로 빈도 집계와 응답/참여자 카운터 채우기"""
+    Question = apps.get_model('voting', 'Question')
+    ShortAnswerResponse = apps.get_model('voting', 'ShortAnswerResponse')
+    ShortAnswerWordCount = apps.get_model('voting', 'ShortAnswerWordCount')
+
+    word_counts = ShortAnswerResponse.objects.values('question_id', 'response_text').annotate(
+        count=Count('id')
+    )
+    ShortAnswerWordCount.objects.bulk_create(
+        ShortAnswerWordCount(**row) for row in word_counts
+    )
+
+    counters = Question.objects.filter(question_type='SHORT_ANSWER').annotate(
+        responses=Count('short_answers'),
+        participants=Count('short_answers__client_fingerprint', distinct=True),
+    ).values_list('id', 'responses', 'participants')
+    for question_id, responses, participants in counters:
+        if responses:
+            Question.objects.filter(id=question_id).update(
+                response_count=responses, participant_count=participants
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0004_add_vote_tallies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='response_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='단답형 응답 수'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='participant_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='단답형 참여자 수'),
+        ),
+        migrations.AddIndex(
+            model_name='shortanswerresponse',
+            index=models.Index(fields=['question', 'client_fingerprint'], name='voting_shor_question_fp_idx'),
+        ),
+        migrations.CreateModel(
+            name='ShortAnswerWordCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('response_text', models.CharField(max_length=200, verbose_name='응답 내용')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='빈도수')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='word_counts', to='voting.question')),
+            ],
+            options={
+                'unique_together': {('question', 'response_text')},
+                'indexes': [models.Index(fields=['question', '-count'], name='voting_word_question_cnt_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_short_answer_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated manually
+
+from django.db import migrations, models
+
+
+def seed_simple_code_pool(apps, schema_editor):
+    """4자리 코드 전체를 풀에 넣고, 활성 질문이 쓰는 코드는 사용 중으로 표시"""
+    Question = apps.get_model('voting', 'Question')
+    SimpleCode = apps.get_model('voting', 'SimpleCode')
+
+    active_codes = set(
+        Question.objects.filter(is_active=True).values_list('simple_code', flat=True)
+    )
+    SimpleCode.objects.bulk_create(
+        (SimpleCode(code=f'{n:04d}', in_use=f'{n:04d}' in active_codes) for n in range(10000)),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0005_add_short_answer_word_counts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='question',
+            name='simple_code',
+            field=models.CharField(blank=True, max_length=5, verbose_name='간단 코드'),
+        ),
+        migrations.CreateModel(
+            name='SimpleCode',
+            fields=[
+                ('code', models.CharField(max_length=5, primary_key=True, serialize=False)),
+                ('in_use', models.BooleanField(default=False)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['in_use', 'code'], name='voting_code_free_idx')],
+            },
+        ),
+        migrations.RunPython(seed_simple_code_pool, migrations.RunPython.noop),
+    ]
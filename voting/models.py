@@ -1,23 +1,87 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.utils import timezone
+from django.conf import settings
 import uuid
 import random
-import string
 
 def generate_simple_code():
-    """중복되지 않는 4자리 코드 생성 (활성 투표만 체크, 비활성 코드는 재사용 가능)"""
-    max_attempts = 100  # 무한 루프 방지
+    """중복되지 않는 활성 코드 할당 (코드 풀에서 원자적으로 꺼냄, 비활성 코드는 풀로 반환되어 재사용)"""
+    return SimpleCode.allocate()
+
+class SimpleCode(models.Model):
+    """간단 코드 풀 (미리 생성된 전체 코드와 사용 중 여부)"""
+    code = models.CharField(max_length=5, primary_key=True)
+    in_use = models.BooleanField(default=False)
+    
+    # 경쟁으로 같은 코드를 놓친 경우 재시도 횟수 (정상적으로는 1번에 성공)
+    MAX_ATTEMPTS = 10
+    
+    class Meta:
+        indexes = [
+            # 임의 시작점 이후의 첫 빈 코드를 인덱스 탐색으로 찾기 위한 인덱스
+            models.Index(fields=['in_use', 'code'], name='voting_code_free_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.code} ({'사용 중' if self.in_use else '사용 가능'})"
+    
+    @staticmethod
+    def all_codes(digits):
+        return (f'{n:0{digits}d}' for n in range(10 ** digits))
     
-    for _ in range(max_attempts):
-        # 4자리 숫자 코드 생성 (10,000개 가능)
-        code = ''.join(random.choices(string.digits, k=4))
+    @classmethod
+    def seed(cls, digits=4):
+        """digits자리 코드 전체를 풀에 추가 (이미 있는 코드는 무시)"""
+        cls.objects.bulk_create(
+            (cls(code=code) for code in cls.all_codes(digits)),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+    
+    @classmethod
+    def allocate(cls):
+        """빈 코드 하나를 원자적으로 사용 중으로 바꾸고 반환"""
+        free = cls.objects.filter(in_use=False).order_by('code').values_list('code', flat=True)
+        
+        for _ in range(cls.MAX_ATTEMPTS):
+            start = f'{random.randrange(10000):04d}'
+            code = free.filter(code__gte=start).first() or free.first()
+            
+            if code is None:
+                if not cls.objects.filter(code='0000').exists():
+                    # 풀이 비어 있으면 4자리 코드로 채움
+                    cls.seed(digits=4)
+                elif getattr(settings, 'SIMPLE_CODE_ALLOW_5_DIGITS', True) and not cls.objects.filter(code='00000').exists():
+                    # 4자리 코드가 모두 사용 중이면 5자리 코드로 확장
+                    cls.seed(digits=5)
+                else:
+                    break
+                continue
+            
+            # 조건부 UPDATE로 동시에 같은 코드를 가져가는 것을 방지
+            if cls.objects.filter(code=code, in_use=False).update(in_use=True):
+                return code
         
-        # 활성 투표에만 해당 코드가 있는지 확인
-        if not Question.objects.filter(simple_code=code, is_active=True).exists():
-            return code
+        raise Exception("코드 생성에 실패했습니다. 잠시 후 다시 시도해주세요.")
     
-    # 만약 100번 시도해도 안되면 예외 발생 (거의 불가능)
-    raise Exception("코드 생성에 실패했습니다. 잠시 후 다시 시도해주세요.")
+    @classmethod
+    def release(cls, codes):
+        """코드를 풀로 반환"""
+        cls.objects.filter(code__in=list(codes)).update(in_use=False)
+
+class QuestionQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """is_active=False로 바꾸는 UPDATE는 그때 활성 상태였던 질문의 간단 코드를 풀로 반환"""
+        if kwargs.get('is_active') is not False:
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            # 잠근 뒤 읽은 활성 질문의 코드만 반환 (이미 종료된 질문의 코드는 다른 질문에 할당됐을 수 있음)
+            codes = [code for code in self.filter(is_active=True).select_for_update().values_list('simple_code', flat=True) if code]
+            updated = super().update(**kwargs)
+            if codes:
+                SimpleCode.release(codes)
+        return updated
 
 class Question(models.Model):
     QUESTION_TYPES = [
@@ -28,17 +92,44 @@ class Question(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     text = models.TextField(verbose_name="질문")
     question_type = models.CharField(max_length=20, choices=QUESTION_TYPES, default='OX', verbose_name="질문 유형")
-    simple_code = models.CharField(max_length=4, unique=False, blank=True, verbose_name="간단 코드")
+    simple_code = models.CharField(max_length=5, unique=False, blank=True, verbose_name="간단 코드")
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     show_results = models.BooleanField(default=False)  # 결과 보이기/숨기기 (O/X 전용)
     creator_session = models.CharField(max_length=40, blank=True, verbose_name="생성자 세션")  # 세션 관리용
     last_activity = models.DateTimeField(default=timezone.now, verbose_name="마지막 활동")  # 활성 상태 추적
+    o_count = models.PositiveIntegerField(default=0, verbose_name="O 득표수")  # Vote 생성/삭제 시 F()로 갱신
+    x_count = models.PositiveIntegerField(default=0, verbose_name="X 득표수")
+    response_count = models.PositiveIntegerField(default=0, verbose_name="단답형 응답 수")  # ShortAnswerResponse 생성/삭제 시 갱신
+    participant_count = models.PositiveIntegerField(default=0, verbose_name="단답형 참여자 수")
+    
+    objects = QuestionQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # 간단 코드 조회 (/<code>/, 통계/토글/종료 API)용 인덱스
+            models.Index(fields=['simple_code', 'is_active'], name='voting_ques_code_active_idx'),
+        ]
     
     def save(self, *args, **kwargs):
-        if not self.simple_code:
-            self.simple_code = generate_simple_code()
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if not self._state.adding and not self.is_active and (update_fields is None or 'is_active' in update_fields):
+            # 관리자 화면 등에서 is_active=False로 저장해도 간단 코드를 풀로 반환 (DB의 활성 상태 기준)
+            with transaction.atomic():
+                Question.mark_inactive(self.pk)
+                super().save(*args, **kwargs)
+            return
+        if self.simple_code:
+            super().save(*args, **kwargs)
+            return
+        # 코드 할당과 INSERT를 한 트랜잭션으로 처리 (저장에 실패하면 할당도 롤백되어 코드가 새지 않음)
+        try:
+            with transaction.atomic():
+                self.simple_code = generate_simple_code()
+                super().save(*args, **kwargs)
+        except Exception:
+            self.simple_code = ''
+            raise
     
     def __str__(self):
         return f"{self.simple_code} - {self.text[:50]}"
@@ -49,21 +140,62 @@ class Question(models.Model):
         self.save(update_fields=['last_activity'])
     
     def deactivate(self):
-        """질문 비활성화"""
+        """질문 비활성화 (간단 코드는 save에서 풀로 반환)"""
         self.is_active = False
+        # 조회 캐시 무효화와 실시간 브로드캐스트 (question_updated 시그널)
         self.save(update_fields=['is_active'])
     
+    @staticmethod
+    def mark_inactive(question_id):
+        """활성 질문이면 비활성화하고 간단 코드를 풀로 반환 (실제로 비활성화했으면 True)
+
+        메모리의 is_active가 아니라 DB의 활성 상태로 판단하므로 (QuestionQuerySet.update), 같은
+        질문을 동시에 두 번 종료해도 그 사이 새 질문에 할당된 코드를 다시 반환하지 않는다.
+        """
+        return bool(Question.objects.filter(id=question_id, is_active=True).update(is_active=False))
+    
+    @staticmethod
+    def apply_vote(question_id, choice, delta=1):
+        """득표수를 F() 표현식으로 원자적으로 증감"""
+        field = 'o_count' if choice == 'O' else 'x_count'
+        queryset = Question.objects.filter(id=question_id)
+        if delta < 0:
+            # 카운터가 어긋난 경우 음수로 내려가지 않도록 방지 (rebuild_tallies로 복구)
+            queryset = queryset.filter(**{f'{field}__gte': -delta})
+        queryset.update(**{field: F(field) + delta})
+    
+    @staticmethod
+    def add_votes(question_id, o_votes, x_votes):
+        """여러 표의 득표수를 F() 표현식으로 한 번에 증가 (투표 버퍼 flush용)"""
+        Question.objects.filter(id=question_id).update(
+            o_count=F('o_count') + o_votes,
+            x_count=F('x_count') + x_votes,
+        )
+    
+    @staticmethod
+    def apply_short_answer(question_id, response_delta, participant_delta):
+        """단답형 응답 수/참여자 수를 F() 표현식으로 원자적으로 증감"""
+        queryset = Question.objects.filter(id=question_id)
+        if response_delta < 0:
+            queryset = queryset.filter(response_count__gte=-response_delta)
+        if participant_delta < 0:
+            queryset = queryset.filter(participant_count__gte=-participant_delta)
+        queryset.update(
+            response_count=F('response_count') + response_delta,
+            participant_count=F('participant_count') + participant_delta,
+        )
+    
     @property
     def total_votes(self):
-        return self.votes.count()
+        return self.o_count + self.x_count
     
     @property
     def o_votes(self):
-        return self.votes.filter(choice='O').count()
+        return self.o_count
     
     @property
     def x_votes(self):
-        return self.votes.filter(choice='X').count()
+        return self.x_count
     
     @property
     def o_percentage(self):
@@ -104,7 +236,56 @@ class ShortAnswerResponse(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['question', 'created_at']),
+            # 참여자별 응답 수 조회 및 첫 응답 여부 확인용
+            models.Index(fields=['question', 'client_fingerprint'], name='voting_shor_question_fp_idx'),
         ]
     
     def __str__(self):
         return f"{self.question.text[:30]} - {self.response_text[:30]}"
+    
+    @classmethod
+    def submit(cls, question, response_text, client_fingerprint):
+        """응답 저장 (INSERT와 빈도/참여자 수 갱신(post_save 시그널)을 한 트랜잭션으로 처리)"""
+        with transaction.atomic():
+            return cls.objects.create(
+                question=question,
+                response_text=response_text,
+                client_fingerprint=client_fingerprint
+            )
+
+class ShortAnswerWordCount(models.Model):
+    """단답형 응답 빈도 집계 (응답 저장/삭제 시 갱신, 워드클라우드 조회용)"""
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='word_counts')
+    response_text = models.CharField(max_length=200, verbose_name="응답 내용")
+    count = models.PositiveIntegerField(default=0, verbose_name="빈도수")
+    
+    class Meta:
+        unique_together = ['question', 'response_text']
+        indexes = [
+            # 빈도수 상위 N개를 인덱스 순서대로 읽기 위한 인덱스
+            models.Index(fields=['question', '-count'], name='voting_word_question_cnt_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.response_text[:30]} ({self.count})"
+    
+    @classmethod
+    def increment(cls, question_id, response_text):
+        """응답 빈도수 +1 (행이 없으면 생성)"""
+        matches = cls.objects.filter(question_id=question_id, response_text=response_text)
+        if matches.update(count=F('count') + 1):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(question_id=question_id, response_text=response_text, count=1)
+        except IntegrityError:
+            # 동시에 다른 요청이 먼저 생성한 경우
+            matches.update(count=F('count') + 1)
+    
+    @classmethod
+    def decrement(cls, question_id, response_text):
+        """응답 빈도수 -1 (0이 되면 행 삭제)"""
+        matches = cls.objects.filter(question_id=question_id, response_text=response_text)
+        if not matches.filter(count__gt=1).update(count=F('count') - 1):
+            matches.delete()
+
@@ -0,0 +1,108 @@
+"""방별 접속자 수 (TTL 하트비트 버킷)
+
+시간을 PRESENCE_HEARTBEAT 초 단위 버킷으로 나누고, 접속한 소켓은 버킷마다 한 번
+캐시 카운터를 올린다. 접속자 수는 직전 버킷과 현재 버킷 중 큰 값이다 (현재 버킷은
+하트비트가 아직 다 들어오지 않았을 수 있음). 정상 종료한 소켓은 올렸던 버킷을 내리고,
+비정상 종료한 소켓은 하트비트가 끊겨 최대 두 버킷 뒤에 수에서 빠진다.
+
+컨슈머는 증감을 프로세스 메모리에 모아 두기만 하고(I/O 없음), 디스패처 스레드가 방
+브로드캐스트를 만들 때 방마다 한 번의 incr로 realtime 캐시에 반영한다. 접속자 수 프레임은
+발표자 화면만 받는다 (presence_{id} 그룹). DB에는 아무것도 쓰지 않으며, 여러 프로세스로
+운영할 때는 공유 캐시가 필요하다 (rooms 참고).
+"""
+import json
+import threading
+import time
+from django.conf import settings
+from .rooms import cache
+
+JITTER_RATIO = 0.1  # 하트비트가 버킷 시작 직후 한꺼번에 몰리지 않도록 흩뜨리는 비율
+
+_pending = {}  # (question_id, 버킷) -> 아직 캐시에 반영하지 않은 증감
+_lock = threading.Lock()
+
+
+def heartbeat_interval():
+    return getattr(settings, 'PRESENCE_HEARTBEAT', 30)
+
+
+def bucket_timeout():
+    # 직전 버킷까지 읽는 동안 남아 있도록 두 버킷보다 조금 길게 보관
+    return heartbeat_interval() * 2 + 5
+
+
+def current_bucket():
+    return int(time.time() // heartbeat_interval())
+
+
+def seconds_until_next_bucket():
+    interval = heartbeat_interval()
+    return interval - time.time() % interval
+
+
+def group_name(question_id):
+    """접속자 수 프레임을 받는 발표자 연결 그룹"""
+    return f'presence_{question_id}'
+
+
+def cache_key(question_id, bucket):
+    return f'presence:{question_id}:{bucket}'
+
+
+def _add(question_id, bucket, delta):
+    key = (str(question_id), bucket)
+    with _lock:
+        _pending[key] = _pending.get(key, 0) + delta
+
+
+def join(question_id):
+    """현재 버킷에 소켓 하나를 기록하고 그 버킷 반환 (메모리에만 기록)"""
+    bucket = current_bucket()
+    _add(question_id, bucket, 1)
+    return bucket
+
+
+def leave(question_id, buckets):
+    """정상 종료한 소켓이 올렸던 버킷에서 빠짐 (이미 만료된 버킷은 무시)"""
+    live = current_bucket() - 1
+    for bucket in buckets:
+        if bucket >= live:
+            _add(question_id, bucket, -1)
+
+
+def flush(question_id):
+    """방의 모아 둔 증감을 캐시에 반영 (디스패처 스레드에서 호출)"""
+    question_id = str(question_id)
+    with _lock:
+        keys = [key for key in _pending if key[0] == question_id]
+        deltas = [(bucket, _pending.pop((room, bucket))) for room, bucket in keys]
+    for bucket, delta in deltas:
+        if delta == 0:
+            continue
+        key = cache_key(question_id, bucket)
+        cache.add(key, 0, bucket_timeout())
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # add와 incr 사이에 만료된 경우
+            cache.add(key, max(delta, 0), bucket_timeout())
+
+
+def count(question_id):
+    """방의 현재 접속자 수"""
+    bucket = current_bucket()
+    counts = cache.get_many([cache_key(question_id, bucket - 1), cache_key(question_id, bucket)])
+    return max([0, *counts.values()])
+
+
+def presence_frame(viewers):
+    return json.dumps({'type': 'presence', 'count': viewers})
+
+
+def changed(question_id, viewers):
+    """마지막으로 브로드캐스트한 접속자 수와 다르면 기록하고 True (디스패처 스레드에서 호출)"""
+    key = f'presence_sent:{question_id}'
+    if cache.get(key) == viewers:
+        return False
+    cache.set(key, viewers, bucket_timeout())
+    return True
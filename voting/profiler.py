@@ -0,0 +1,152 @@
+"""요청 프로파일러 (REQUEST_PROFILER = True일 때만 설치)
+
+voting 뷰 요청마다 SQL 쿼리 수, DB 시간, 템플릿 렌더링 시간(그 사이 실행된 쿼리 시간 제외)을
+재고, 같은 SQL이 반복되는 N+1 패턴을 찾는다. PROFILER_SLOW_MS를 넘거나 반복 쿼리가 있는
+요청은 voting 로거로 JSON 한 줄을 남기고, PROFILER_SAMPLE_RATE 비율로 쿼리 목록까지 담은
+트레이스를 메모리에 보관해 /metrics/traces 로 내보낸다.
+"""
+import contextvars
+import json
+import logging
+import random
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TRACE_BUFFER_SIZE = 100  # 보관할 샘플 트레이스 수
+
+_trace = contextvars.ContextVar('request_trace', default=None)
+_traces = deque(maxlen=TRACE_BUFFER_SIZE)
+
+
+class RequestTrace:
+    """요청 하나의 쿼리와 시간 기록"""
+
+    def __init__(self, request):
+        self.method = request.method
+        self.path = request.path
+        self.view = None
+        self.duration = 0.0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.queries = []  # (SQL, 초), SQL은 파라미터 자리표시자(%s) 형태
+
+    def record_query(self, sql, seconds):
+        self.queries.append((sql, seconds))
+        self.db_time += seconds
+
+    def repeated_queries(self, threshold):
+        """threshold번 이상 실행된 같은 SQL (N+1 의심)"""
+        counts = Counter(sql for sql, _ in self.queries)
+        return [{'sql': sql, 'count': count} for sql, count in counts.most_common() if count >= threshold]
+
+    def as_dict(self, include_queries=False):
+        data = {
+            'method': self.method,
+            'path': self.path,
+            'view': self.view,
+            'duration_ms': round(self.duration * 1000, 3),
+            'queries': len(self.queries),
+            'db_ms': round(self.db_time * 1000, 3),
+            'template_ms': round(self.template_time * 1000, 3),
+        }
+        if include_queries:
+            data['sql'] = [{'sql': sql, 'ms': round(seconds * 1000, 3)} for sql, seconds in self.queries]
+        return data
+
+
+def profile_query(execute, sql, params, many, context):
+    trace = _trace.get()
+    if trace is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        trace.record_query(sql, time.perf_counter() - started)
+
+
+def install_query_profiler(sender, connection, **kwargs):
+    if profile_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(profile_query)
+
+
+def install():
+    """이후 열리는 모든 DB 연결에 쿼리 기록 래퍼를 붙임 (프로파일러를 켰을 때만 호출)"""
+    connection_created.connect(install_query_profiler)
+    for connection in connections.all():
+        install_query_profiler(None, connection)
+
+
+class ProfiledTemplate:
+    """render 시간을 현재 요청 트레이스에 더하는 템플릿 래퍼"""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        trace = _trace.get()
+        if trace is None:
+            return self.template.render(context, request)
+        started, db_before = time.perf_counter(), trace.db_time
+        try:
+            return self.template.render(context, request)
+        finally:
+            # 템플릿에서 평가된 지연 쿼리셋의 DB 시간은 db_ms에 이미 들어가므로 뺌
+            trace.template_time += time.perf_counter() - started - (trace.db_time - db_before)
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    """렌더링 시간을 재는 DjangoTemplates 백엔드 (TEMPLATES의 BACKEND로 지정)"""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name))
+
+
+def finish(request, trace):
+    match = getattr(request, 'resolver_match', None)
+    if match is None or match.func.__module__ != 'voting.views':
+        return
+    trace.view = match.url_name
+
+    repeated = trace.repeated_queries(getattr(settings, 'PROFILER_REPEATED_QUERY_THRESHOLD', 5))
+    slow = trace.duration * 1000 >= getattr(settings, 'PROFILER_SLOW_MS', 500)
+    if slow or repeated:
+        summary = trace.as_dict()
+        summary['repeated_queries'] = repeated
+        logger.warning(f"{'Slow request' if slow else 'Repeated queries'}: {json.dumps(summary)}")
+
+    if random.random() < getattr(settings, 'PROFILER_SAMPLE_RATE', 0.01):
+        _traces.append({'time': timezone.now().isoformat(), **trace.as_dict(include_queries=True)})
+
+
+@contextmanager
+def profile_request(request):
+    """요청 처리 중 쿼리와 템플릿 시간을 모아 끝나면 로그/샘플로 남김"""
+    trace = RequestTrace(request)
+    token = _trace.set(trace)
+    started = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.duration = time.perf_counter() - started
+        _trace.reset(token)
+        finish(request, trace)
+
+
+def export_traces():
+    """보관 중인 샘플 트레이스 (오래된 것부터)"""
+    return list(_traces)
@@ -0,0 +1,26 @@
+"""QR 코드 이미지 생성 (프로세스 내 LRU 캐시)"""
+import hashlib
+from functools import lru_cache
+from io import BytesIO
+import qrcode
+
+DEFAULT_BOX_SIZE = 10
+MAX_BOX_SIZE = 40
+
+# 같은 URL/크기의 QR 코드는 항상 같은 이미지이므로 렌더링 결과를 캐시
+@lru_cache(maxsize=256)
+def render_qr_png(data, box_size=DEFAULT_BOX_SIZE):
+    """data를 담은 QR 코드 PNG 바이트 생성"""
+    qr = qrcode.QRCode(version=1, box_size=box_size, border=5)
+    qr.add_data(data)
+    qr.make(fit=True)
+    
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def qr_etag(data, box_size=DEFAULT_BOX_SIZE):
+    """이미지를 만들지 않고 계산할 수 있는 강한 ETag (따옴표 포함)"""
+    digest = hashlib.sha256(f'{box_size}:{data}'.encode()).hexdigest()[:32]
+    return f'"{digest}"'
@@ -0,0 +1,193 @@
+"""방별 실시간 통계 상태 (버전, 마지막 스냅샷, 최근 델타 기록)
+
+방(room)은 (메시지 종류, question_id)이며, 통계가 바뀌어 브로드캐스트할 때마다
+버전이 1씩 오른다. O/X 방은 전체 통계 대신 이전 버전과의 차이(vote_delta)만 보내고
+최근 델타를 HISTORY_SIZE개까지 보관해, 재접속한 클라이언트가 마지막으로 받은
+버전 이후의 델타만 받을 수 있게 한다. 이어 줄 수 없으면 전체 스냅샷을 보낸다.
+
+프레임 형식:
+    {"type": "vote_stats", "v": 12, "data": {...}}              전체 스냅샷
+    {"type": "vote_delta", "v": 13, "o": 2, "show_results": true}  바뀐 값만 (o, x는 증감)
+    {"type": "short_answer_stats", "v": 4, "data": {...}}       단답형은 항상 전체 스냅샷
+
+상태는 realtime 캐시(CACHES)에 두며, 브로드캐스트 쓰기는 디스패처 스레드에서만 일어난다.
+여러 프로세스로 운영할 때는 공유 캐시(Redis 등)로 설정해야 한다.
+"""
+import asyncio
+import json
+import time
+from collections import namedtuple
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+from .stats import (
+    EMPTY_STATS, ShortAnswerStats, aget_vote_stats, aget_short_answer_stats, single_flight,
+)
+
+# 실시간 상태 전용 캐시 (간단 코드 조회 캐시 항목에 밀려 지워지지 않도록 분리, presence도 사용)
+cache = ConnectionProxy(caches, 'realtime')
+
+SNAPSHOT_TIMEOUT = 3600  # 초
+HISTORY_SIZE = 50  # 재접속 시 델타로 이어 줄 수 있는 최대 버전 차이
+
+RoomSnapshot = namedtuple('RoomSnapshot', ['version', 'stats', 'text'])
+RoomFrame = namedtuple('RoomFrame', ['version', 'text', 'delta'])  # 보낼 프레임 (delta: vote_delta 여부)
+
+_fetchers = {
+    'vote_stats': aget_vote_stats,
+    'short_answer_stats': aget_short_answer_stats,
+}
+_empty = {
+    'vote_stats': EMPTY_STATS,
+    'short_answer_stats': ShortAnswerStats(),
+}
+
+
+def cache_key(kind, message_type, question_id):
+    return f'room_{kind}:{message_type}:{question_id}'
+
+
+def snapshot_frame(message_type, version, stats):
+    """전체 스냅샷 프레임"""
+    return json.dumps({'type': message_type, 'v': version, 'data': stats.as_dict()})
+
+
+def vote_delta(previous, stats):
+    """두 O/X 통계의 차이 (바뀐 값만)"""
+    delta = {}
+    if stats.o_votes != previous.o_votes:
+        delta['o'] = stats.o_votes - previous.o_votes
+    if stats.x_votes != previous.x_votes:
+        delta['x'] = stats.x_votes - previous.x_votes
+    if stats.show_results != previous.show_results:
+        delta['show_results'] = stats.show_results
+    return delta
+
+
+def next_version(message_type, question_id):
+    """방의 다음 버전 발급
+
+    버전이 처음이거나 캐시에서 사라졌으면 현재 시각(ms)에서 시작하므로,
+    이전에 발급한 어떤 버전보다도 크다 (클라이언트의 옛 버전과 겹치지 않음).
+    """
+    key = cache_key('version', message_type, question_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        seed = int(time.time() * 1000)
+        if cache.add(key, seed, None):
+            return seed
+        return cache.incr(key)
+
+
+def publish(message_type, question_id, stats):
+    """새 통계를 방의 다음 버전으로 기록하고 브로드캐스트할 RoomFrame 반환 (바뀐 것이 없으면 None)"""
+    snapshot_key = cache_key('snapshot', message_type, question_id)
+    history_key = cache_key('history', message_type, question_id)
+
+    previous = cache.get(snapshot_key)
+    if previous is not None and previous.stats == stats:
+        return None
+
+    version = next_version(message_type, question_id)
+    snapshot = RoomSnapshot(version, stats, snapshot_frame(message_type, version, stats))
+    cache.set(snapshot_key, snapshot, SNAPSHOT_TIMEOUT)
+
+    # 바로 앞 버전의 스냅샷이 있을 때만 델타로 보낼 수 있음
+    if message_type != 'vote_stats' or previous is None or previous.version != version - 1:
+        cache.delete(history_key)
+        return RoomFrame(version, snapshot.text, False)
+
+    frame = json.dumps({'type': 'vote_delta', 'v': version, **vote_delta(previous.stats, stats)})
+    history = cache.get(history_key) or []
+    if history and history[-1][0] != previous.version:
+        history = []
+    history = (history + [(version, frame)])[-HISTORY_SIZE:]
+    cache.set(history_key, history, SNAPSHOT_TIMEOUT)
+    return RoomFrame(version, frame, True)
+
+
+def forget(message_type, question_id):
+    """삭제된 질문의 방 상태 제거"""
+    cache.delete_many([
+        cache_key('snapshot', message_type, question_id),
+        cache_key('history', message_type, question_id),
+    ])
+
+
+async def _load_snapshot(message_type, question_id):
+    key = cache_key('snapshot', message_type, question_id)
+    snapshot = await cache.aget(key)
+    if snapshot is None:
+        stats = await _fetchers[message_type](question_id)
+        if stats is None:
+            return None
+        version = await sync_to_async(next_version)(message_type, question_id)
+        snapshot = RoomSnapshot(version, stats, snapshot_frame(message_type, version, stats))
+        # 계산하는 동안 브로드캐스트가 더 새로운 스냅샷을 저장했다면 그것을 사용
+        if not await cache.aadd(key, snapshot, SNAPSHOT_TIMEOUT):
+            snapshot = await cache.aget(key) or snapshot
+    return snapshot
+
+
+async def aget_snapshot(message_type, question_id):
+    """방의 마지막 스냅샷 (없을 때만 DB에서 계산, 질문이 없으면 None)
+
+    Django 4.2의 비동기 캐시 API도 내부적으로 스레드를 거치므로 동시 조회는 하나로 합친다.
+    """
+    return await single_flight(
+        ('snapshot', message_type, str(question_id)), lambda: _load_snapshot(message_type, question_id)
+    )
+
+
+async def aresume(message_type, question_id, since=None):
+    """since 버전 이후 놓친 프레임(RoomFrame) 목록
+
+    since가 없거나 기록된 델타로 이어 줄 수 없으면 전체 스냅샷 하나를, 이미 최신이면 빈 목록을 반환한다.
+    """
+    snapshot = await aget_snapshot(message_type, question_id)
+    if snapshot is None:
+        return [RoomFrame(0, snapshot_frame(message_type, 0, _empty[message_type]), False)]
+    if since == snapshot.version:
+        return []
+
+    if since is not None and since < snapshot.version:
+        history = await cache.aget(cache_key('history', message_type, question_id)) or []
+        missed = [(version, frame) for version, frame in history if version > since]
+        if missed and missed[0][0] == since + 1 and missed[-1][0] == snapshot.version:
+            return [RoomFrame(version, frame, True) for version, frame in missed]
+
+    return [RoomFrame(snapshot.version, snapshot.text, False)]
+
+
+async def await_change(message_type, question_id, known_version, timeout):
+    """방 스냅샷이 known_version에서 바뀔 때까지 최대 timeout초 대기 후 스냅샷 반환 (질문이 없으면 None)
+
+    vote_{id} 그룹을 먼저 구독한 뒤 스냅샷을 확인하므로 그 사이의 브로드캐스트도 놓치지 않으며,
+    기다리는 동안에는 DB도 캐시도 조회하지 않는다.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None or timeout <= 0:
+        return await aget_snapshot(message_type, question_id)
+
+    group = f'vote_{question_id}'
+    channel = await channel_layer.new_channel()
+    await channel_layer.group_add(group, channel)
+    try:
+        snapshot = await aget_snapshot(message_type, question_id)
+        if snapshot is None or snapshot.version != known_version:
+            return snapshot
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await asyncio.wait_for(channel_layer.receive(channel), remaining)
+            except asyncio.TimeoutError:
+                break
+            if message.get('type') == message_type:
+                break
+        return await aget_snapshot(message_type, question_id)
+    finally:
+        await channel_layer.group_discard(group, channel)
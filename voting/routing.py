@@ -3,4 +3,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'ws/vote/(?P<question_id>[0-9a-f-]+)/$', consumers.VoteConsumer.as_asgi()),
+    re_path(r'ws/short-answer/(?P<question_id>[0-9a-f-]+)/$', consumers.ShortAnswerConsumer.as_asgi()),
 ] 
\ No newline at end of file
@@ -1,60 +1,161 @@
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from .models import Vote, Question
+from django.conf import settings
+from .models import Vote, Question, ShortAnswerResponse, ShortAnswerWordCount
+from .stats import get_vote_stats, get_short_answer_stats
+from .broadcast import BroadcastDispatcher
+from . import lookup
+from . import rooms
+from . import metrics
+from . import presence
 import logging
 
 logger = logging.getLogger(__name__)
-channel_layer = get_channel_layer()
 
-def broadcast_vote_stats(question_id):
-    """투표 통계를 WebSocket으로 브로드캐스트"""
-    try:
-        question = Question.objects.get(id=question_id)
-        stats = {
-            'show_results': question.show_results,
-            'o_percentage': question.o_percentage,
-            'x_percentage': question.x_percentage,
-            'total_votes': question.total_votes,
-            'o_votes': question.o_votes,
-            'x_votes': question.x_votes,
-        }
-        
-        room_group_name = f'vote_{question_id}'
-        
-        if channel_layer:
-            async_to_sync(channel_layer.group_send)(
-                room_group_name,
-                {
-                    'type': 'vote_stats',
-                    'data': stats
-                }
-            )
+# 실시간 통계에 영향을 주는 Question 필드 (last_activity 갱신 등은 브로드캐스트하지 않음)
+BROADCAST_FIELDS = {'show_results', 'is_active'}
+# 간단 코드 조회 캐시에 담긴 Question 필드
+LOOKUP_FIELDS = {'simple_code', 'question_type', 'is_active', 'show_results'}
+
+def build_room_message(room):
+    """브로드캐스트할 통계 메시지 생성 및 방 상태 갱신 (디스패처 스레드에서 호출)
+
+    room은 (메시지 종류, question_id) 튜플이며, 통계는 vote_{id} 그룹으로 전송한다.
+    'presence'는 통계 대신 접속자 수 프레임을 발표자 그룹으로 보낸다 (voting.presence).
+    이벤트의 text는 컨슈머가 그대로 전달하는 완성된 프레임, version은 그 프레임의 방 버전,
+    delta는 그 프레임이 이전 버전에 이어 적용하는 vote_delta인지 여부다.
+    """
+    message_type, question_id = room
+    if message_type == 'presence':
+        # 컨슈머가 모아 둔 증감을 반영하고, 접속자 수는 바뀌었을 때만 전송 (하트비트마다 요청되므로)
+        presence.flush(question_id)
+        viewers = presence.count(question_id)
+        if not presence.changed(question_id, viewers):
+            return None
+        return presence.group_name(question_id), {'type': 'presence', 'text': presence.presence_frame(viewers)}
+
+    with metrics.broadcast_build_duration.time(message_type):
+        if message_type == 'short_answer_stats':
+            stats = get_short_answer_stats(question_id)
         else:
-            logger.warning("Channel layer not available")
-            
-    except Question.DoesNotExist:
+            stats = get_vote_stats(question_id)
+    if stats is None:
         logger.error(f"Question {question_id} not found")
-    except Exception as e:
-        logger.error(f"Error broadcasting vote stats: {e}")
+        rooms.forget(message_type, question_id)
+        return None
+
+    # 방 버전을 올리고 스냅샷 갱신 (O/X는 이전 버전과의 델타 프레임, 바뀐 것이 없으면 None)
+    frame = rooms.publish(message_type, question_id, stats)
+    if frame is None:
+        return None
+
+    # 소켓마다 json.dumps 하지 않도록 텍스트 프레임을 한 번만 만들어 보냄
+    return f'vote_{question_id}', {
+        'type': message_type,
+        'version': frame.version,
+        'text': frame.text,
+        'delta': frame.delta
+    }
+
+# 방마다 VOTE_BROADCAST_INTERVAL 초에 최대 한 번만 브로드캐스트 (마지막 상태는 항상 전송)
+vote_broadcaster = BroadcastDispatcher(
+    build_room_message,
+    interval=getattr(settings, 'VOTE_BROADCAST_INTERVAL', 0.2),
+    maxsize=getattr(settings, 'VOTE_BROADCAST_QUEUE_SIZE', 1000),
+)
+
+def broadcast_vote_stats(question_id):
+    """투표 통계를 WebSocket으로 브로드캐스트 (트랜잭션 커밋 후 백그라운드 전송)"""
+    room = ('vote_stats', str(question_id))
+    transaction.on_commit(lambda: vote_broadcaster.request(room))
+
+def broadcast_presence(question_id):
+    """방 접속자 수를 WebSocket으로 브로드캐스트 (바뀐 경우에만, 백그라운드 전송)"""
+    vote_broadcaster.request(('presence', str(question_id)))
+
+def broadcast_short_answer_stats(question_id):
+    """단답형 통계를 WebSocket으로 브로드캐스트 (트랜잭션 커밋 후 백그라운드 전송)"""
+    room = ('short_answer_stats', str(question_id))
+    transaction.on_commit(lambda: vote_broadcaster.request(room))
 
 @receiver(post_save, sender=Vote)
 def vote_created_or_updated(sender, instance, created, **kwargs):
     """투표가 생성되거나 업데이트될 때 실시간 통계 업데이트"""
     if created:
-        logger.info(f"New vote created for question {instance.question.id}")
-    broadcast_vote_stats(instance.question.id)
+        logger.info(f"New vote created for question {instance.question_id}")
+        Question.apply_vote(instance.question_id, instance.choice, 1)
+        metrics.votes_ingested.inc(instance.choice)
+    broadcast_vote_stats(instance.question_id)
 
 @receiver(post_delete, sender=Vote)
 def vote_deleted(sender, instance, **kwargs):
     """투표가 삭제될 때 실시간 통계 업데이트"""
-    logger.info(f"Vote deleted for question {instance.question.id}")
-    broadcast_vote_stats(instance.question.id)
+    logger.info(f"Vote deleted for question {instance.question_id}")
+    Question.apply_vote(instance.question_id, instance.choice, -1)
+    broadcast_vote_stats(instance.question_id)
+
+def participant_responses(instance):
+    """같은 참여자의 응답 (question, client_fingerprint 인덱스 사용)"""
+    return ShortAnswerResponse.objects.filter(
+        question_id=instance.question_id,
+        client_fingerprint=instance.client_fingerprint,
+    )
+
+def has_other_responses(instance):
+    """같은 참여자의 다른 응답이 있는지 확인"""
+    return participant_responses(instance).exclude(pk=instance.pk).exists()
+
+def is_first_response(instance):
+    """참여자의 첫 응답인지 확인 (자기보다 먼저 저장된 응답이 없음)
+
+    다른 응답이 있는지로 판단하면 같은 참여자가 동시에 두 번 제출했을 때 서로의 행을 보고
+    둘 다 첫 응답이 아니라고 판단하므로, 저장 순서(pk)로 하나만 첫 응답이 되게 한다.
+    """
+    return not participant_responses(instance).filter(pk__lt=instance.pk).exists()
+
+@receiver(post_save, sender=ShortAnswerResponse)
+def short_answer_created(sender, instance, created, **kwargs):
+    """단답형 응답이 제출될 때 빈도 집계 갱신 및 워드클라우드 실시간 업데이트"""
+    if created:
+        with transaction.atomic():
+            ShortAnswerWordCount.increment(instance.question_id, instance.response_text)
+            Question.apply_short_answer(instance.question_id, 1, 1 if is_first_response(instance) else 0)
+        metrics.short_answers_ingested.inc()
+        broadcast_short_answer_stats(instance.question_id)
+
+@receiver(post_delete, sender=ShortAnswerResponse)
+def short_answer_deleted(sender, instance, **kwargs):
+    """단답형 응답이 삭제될 때 빈도 집계 갱신 및 워드클라우드 실시간 업데이트"""
+    with transaction.atomic():
+        ShortAnswerWordCount.decrement(instance.question_id, instance.response_text)
+        was_last_response = not has_other_responses(instance)
+        Question.apply_short_answer(instance.question_id, -1, -1 if was_last_response else 0)
+    broadcast_short_answer_stats(instance.question_id)
 
 @receiver(post_save, sender=Question)
-def question_updated(sender, instance, created, **kwargs):
+def question_updated(sender, instance, created, update_fields=None, **kwargs):
     """질문이 업데이트될 때 (특히 show_results 변경 시) 실시간 업데이트"""
-    if not created:  # 질문이 수정된 경우에만
-        logger.info(f"Question {instance.id} updated")
-        broadcast_vote_stats(instance.id) 
\ No newline at end of file
+    if update_fields is None or LOOKUP_FIELDS.intersection(update_fields):
+        simple_code = instance.simple_code
+        transaction.on_commit(lambda: lookup.invalidate([simple_code]))
+    if created:
+        return
+    if update_fields is not None and not BROADCAST_FIELDS.intersection(update_fields):
+        return
+    logger.info(f"Question {instance.id} updated")
+    if instance.question_type == 'SHORT_ANSWER':
+        broadcast_short_answer_stats(instance.id)
+    else:
+        broadcast_vote_stats(instance.id)
+
+@receiver(pre_delete, sender=Question)
+def question_deleting(sender, instance, **kwargs):
+    """활성 질문이 삭제되면 간단 코드를 풀로 반환 (삭제와 같은 트랜잭션, DB의 활성 상태 기준)"""
+    Question.mark_inactive(instance.pk)
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    """질문이 삭제되면 조회 캐시 무효화"""
+    simple_code = instance.simple_code
+    transaction.on_commit(lambda: lookup.invalidate([simple_code]))
@@ -0,0 +1,69 @@
+"""Server-Sent Events 실시간 통계 스트림 (WebSocket 업그레이드가 막힌 네트워크용)
+
+VoteConsumer와 같은 vote_{id} 그룹을 구독해 같은 프레임(rooms 참고)을 그대로 data로
+보내고, 방 버전을 이벤트 id로 붙인다. EventSource는 연결이 끊기면 Last-Event-ID를
+보내며 다시 접속하므로 놓친 델타만 이어 받는다.
+"""
+import asyncio
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from . import presence
+from . import rooms
+
+HEARTBEAT_INTERVAL = 15  # 초, 프록시가 유휴 연결을 끊지 않도록 보내는 주석 간격
+# Django 4.2는 스트리밍 중 클라이언트 연결 끊김을 알려 주지 않으므로, 스트림을 주기적으로
+# 끝내 그룹 구독을 정리하고 EventSource가 Last-Event-ID로 다시 접속하게 한다.
+STREAM_MAX_AGE = 300  # 초
+RETRY_MS = 3000  # EventSource 재접속 대기 시간
+
+def sse_event(version, text):
+    return f'id: {version}\ndata: {text}\n\n'
+
+def presence_event(text):
+    # 버전이 없는 프레임이므로 id 없이 보냄 (Last-Event-ID는 유지됨)
+    return f'data: {text}\n\n'
+
+async def stats_events(message_type, question_id, since=None, presenter=False):
+    """방의 통계 프레임을 SSE 형식으로 내보내는 비동기 제너레이터
+
+    처음에는 since 이후 놓친 프레임(없으면 전체 스냅샷)을 보내고, 이후에는 브로드캐스트를 그대로 전달한다.
+    발표자 화면(presenter)이면 접속자 수 프레임도 함께 보낸다 (voting.presence).
+    """
+    channel_layer = get_channel_layer()
+    groups = [f'vote_{question_id}']
+    if presenter:
+        groups.append(presence.group_name(question_id))
+    channel = None
+    if channel_layer is not None:
+        # 초기 프레임을 만들기 전에 구독해야 그 사이의 브로드캐스트를 놓치지 않음
+        channel = await channel_layer.new_channel()
+        for group in groups:
+            await channel_layer.group_add(group, channel)
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        for frame in await rooms.aresume(message_type, question_id, since):
+            yield sse_event(frame.version, frame.text)
+        if presenter:
+            viewers = await sync_to_async(presence.count, thread_sensitive=False)(question_id)
+            yield presence_event(presence.presence_frame(viewers))
+        if channel is None:
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + STREAM_MAX_AGE
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await asyncio.wait_for(
+                    channel_layer.receive(channel), min(HEARTBEAT_INTERVAL, remaining)
+                )
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if message.get('type') == message_type:
+                yield sse_event(message['version'], message['text'])
+            elif message.get('type') == 'presence':
+                yield presence_event(message['text'])
+    finally:
+        if channel is not None:
+            for group in groups:
+                await channel_layer.group_discard(group, channel)
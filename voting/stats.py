@@ -0,0 +1,169 @@
+"""투표 통계 스냅샷 (뷰, 컨슈머, 시그널 공용)"""
+import asyncio
+import json
+from dataclasses import dataclass
+from functools import cached_property
+from .models import Question, ShortAnswerWordCount
+
+# 워드클라우드에 보여줄 최대 응답 수
+WORD_CLOUD_LIMIT = 100
+
+
+@dataclass(frozen=True)
+class VoteStats:
+    """한 시점의 O/X 투표 통계"""
+    show_results: bool = False
+    o_votes: int = 0
+    x_votes: int = 0
+
+    @classmethod
+    def from_question(cls, question):
+        """이미 조회한 Question 객체로 스냅샷 생성 (추가 쿼리 없음)"""
+        return cls(question.show_results, question.o_count, question.x_count)
+
+    @property
+    def total_votes(self):
+        return self.o_votes + self.x_votes
+
+    @property
+    def o_percentage(self):
+        if self.total_votes == 0:
+            return 0
+        return round((self.o_votes / self.total_votes) * 100, 1)
+
+    @property
+    def x_percentage(self):
+        if self.total_votes == 0:
+            return 0
+        return round((self.x_votes / self.total_votes) * 100, 1)
+
+    def as_dict(self):
+        return {
+            'show_results': self.show_results,
+            'o_percentage': self.o_percentage,
+            'x_percentage': self.x_percentage,
+            'total_votes': self.total_votes,
+            'o_votes': self.o_votes,
+            'x_votes': self.x_votes,
+        }
+
+    @cached_property
+    def json(self):
+        """HTTP 응답용 JSON 바이트 (한 번만 직렬화)"""
+        return json.dumps(self.as_dict()).encode()
+
+
+EMPTY_STATS = VoteStats()
+
+
+def get_vote_stats(question_id):
+    """질문의 통계 스냅샷을 한 번의 쿼리로 조회 (질문이 없으면 None)"""
+    row = Question.objects.filter(id=question_id).values_list(
+        'show_results', 'o_count', 'x_count'
+    ).first()
+    if row is None:
+        return None
+    return VoteStats(*row)
+
+
+# 진행 중인 비동기 조회 (같은 방에 동시에 접속해도 DB 조회는 한 번만)
+_inflight = {}
+
+
+async def single_flight(key, fetch):
+    """같은 key의 동시 조회를 하나의 조회로 합쳐 결과를 공유"""
+    loop = asyncio.get_running_loop()
+    task = _inflight.get(key)
+    if task is None or task.get_loop() is not loop:
+        task = loop.create_task(fetch())
+        _inflight[key] = task
+
+        def forget(done):
+            if _inflight.get(key) is done:
+                del _inflight[key]
+        task.add_done_callback(forget)
+    # 기다리던 쪽이 취소되어도 다른 대기자를 위해 조회는 계속
+    return await asyncio.shield(task)
+
+
+async def _fetch_vote_stats(question_id):
+    row = await Question.objects.filter(id=question_id).values_list(
+        'show_results', 'o_count', 'x_count'
+    ).afirst()
+    if row is None:
+        return None
+    return VoteStats(*row)
+
+
+async def aget_vote_stats(question_id):
+    """get_vote_stats의 비동기 ORM 버전 (동시 조회는 하나로 합침)"""
+    return await single_flight(('vote_stats', str(question_id)), lambda: _fetch_vote_stats(question_id))
+
+
+@dataclass(frozen=True)
+class ShortAnswerStats:
+    """한 시점의 단답형 응답 통계"""
+    total_responses: int = 0
+    unique_participants: int = 0
+    word_data: tuple = ()  # (응답 내용, 빈도수) 쌍, 빈도수 내림차순
+
+    def as_dict(self):
+        return {
+            'total_responses': self.total_responses,
+            'unique_participants': self.unique_participants,
+            'word_data': [
+                {'response_text': text, 'count': count} for text, count in self.word_data
+            ],
+        }
+
+    @cached_property
+    def json(self):
+        """HTTP 응답용 JSON 바이트 (한 번만 직렬화)"""
+        return json.dumps(self.as_dict()).encode()
+
+
+def get_short_answer_stats(question_id):
+    """질문의 단답형 통계 스냅샷 조회 (유지되는 집계 테이블에서 인덱스 순서로 읽음, 질문이 없으면 None)"""
+    counters = Question.objects.filter(id=question_id).values_list(
+        'response_count', 'participant_count'
+    ).first()
+    if counters is None:
+        return None
+    
+    # 워드 클라우드용 데이터 (빈도수 상위 WORD_CLOUD_LIMIT개)
+    word_data = ShortAnswerWordCount.objects.filter(
+        question_id=question_id
+    ).order_by('-count').values_list('response_text', 'count')[:WORD_CLOUD_LIMIT]
+    
+    return ShortAnswerStats(
+        total_responses=counters[0],
+        unique_participants=counters[1],
+        word_data=tuple(word_data),
+    )
+
+
+async def _fetch_short_answer_stats(question_id):
+    counters = await Question.objects.filter(id=question_id).values_list(
+        'response_count', 'participant_count'
+    ).afirst()
+    if counters is None:
+        return None
+
+    word_data = [
+        row async for row in ShortAnswerWordCount.objects.filter(
+            question_id=question_id
+        ).order_by('-count').values_list('response_text', 'count')[:WORD_CLOUD_LIMIT]
+    ]
+    return ShortAnswerStats(
+        total_responses=counters[0],
+        unique_participants=counters[1],
+        word_data=tuple(word_data),
+    )
+
+
+async def aget_short_answer_stats(question_id):
+    """get_short_answer_stats의 비동기 ORM 버전 (동시 조회는 하나로 합침)"""
+    return await single_flight(
+        ('short_answer_stats', str(question_id)), lambda: _fetch_short_answer_stats(question_id)
+    )
+
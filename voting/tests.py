@@ -1,3 +1,1106 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError
+from django.utils import timezone
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import resolve
+from .models import Question, Vote, ShortAnswerResponse, ShortAnswerWordCount, SimpleCode
+from .stats import VoteStats, get_vote_stats
+from .consumers import LatestStatsMixin
+from .bench import IN_MEMORY_CHANNEL_LAYERS
+from .broadcast import BroadcastDispatcher, CircuitBreaker
+from .ingest import VoteBuffer
+from .signals import build_room_message, vote_broadcaster
+from . import rooms
+from . import metrics
+from . import profiler
+from . import presence
+from . import lookup
+from . import votes
+
+
+def clear_caches():
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+def counter_value(counter, *labels):
+    """카운터의 현재 값 (레이블 값 순서대로)"""
+    return {sample_labels: value for _, sample_labels, _, value in counter.samples()}.get(labels, 0)
+
+
+class VoteStatsTests(TestCase):
+    def setUp(self):
+        self.question = Question.objects.create(text='테스트 질문')
+
+    def test_snapshot_costs_one_query(self):
+        for i, choice in enumerate(['O', 'O', 'X']):
+            Vote.objects.create(question=self.question, choice=choice, client_fingerprint=f'fp{i}')
+
+        with self.assertNumQueries(1):
+            stats = get_vote_stats(self.question.id)
+            stats.json
+
+        self.assertEqual(stats, VoteStats(show_results=False, o_votes=2, x_votes=1))
+        self.assertEqual(stats.total_votes, 3)
+        self.assertEqual(stats.o_percentage, 66.7)
+        self.assertEqual(stats.x_percentage, 33.3)
+
+    def test_missing_question(self):
+        question_id = self.question.id
+        self.question.delete()
+        self.assertIsNone(get_vote_stats(question_id))
+
+    def test_empty_percentages(self):
+        self.assertEqual(get_vote_stats(self.question.id).as_dict()['o_percentage'], 0)
+
+
+class SimpleCodeTests(TestCase):
+    def in_use(self, code):
+        return SimpleCode.objects.get(code=code).in_use
+
+    def test_allocates_distinct_codes(self):
+        codes = [Question.objects.create(text=f'질문 {i}').simple_code for i in range(5)]
+        self.assertEqual(len(set(codes)), 5)
+        self.assertTrue(all(len(code) == 4 and self.in_use(code) for code in codes))
+
+    def test_failed_insert_does_not_leak_code(self):
+        Question.objects.create(text='풀 채우기')
+        in_use = SimpleCode.objects.filter(in_use=True).count()
+        question = Question(text=None)
+        with self.assertRaises(IntegrityError):
+            question.save()
+        self.assertEqual(question.simple_code, '')
+        self.assertEqual(SimpleCode.objects.filter(in_use=True).count(), in_use)
+
+    def test_exhausted_pool_expands_to_five_digits(self):
+        SimpleCode.seed(digits=4)
+        SimpleCode.objects.update(in_use=True)
+        with override_settings(SIMPLE_CODE_ALLOW_5_DIGITS=False):
+            with self.assertRaises(Exception):
+                Question.objects.create(text='코드 없음')
+        question = Question.objects.create(text='5자리 코드')
+        self.assertEqual(len(question.simple_code), 5)
+        self.assertTrue(self.in_use(question.simple_code))
+
+    def test_deactivate_releases_code_once(self):
+        question = Question.objects.create(text='테스트 질문')
+        stale = Question.objects.get(id=question.id)
+        question.deactivate()
+        self.assertFalse(self.in_use(question.simple_code))
+
+        # 반환된 코드가 새 질문에 할당된 뒤 오래된 인스턴스로 다시 종료해도 반환하지 않음
+        SimpleCode.objects.filter(code=question.simple_code).update(in_use=True)
+        stale.deactivate()
+        self.assertTrue(self.in_use(question.simple_code))
+        self.assertFalse(Question.objects.get(id=question.id).is_active)
+
+    def test_delete_releases_only_active_code(self):
+        active = Question.objects.create(text='활성 질문')
+        active.delete()
+        self.assertFalse(self.in_use(active.simple_code))
+
+        ended = Question.objects.create(text='종료된 질문')
+        stale = Question.objects.get(id=ended.id)
+        ended.deactivate()
+        SimpleCode.objects.filter(code=ended.simple_code).update(in_use=True)
+        stale.delete()
+        self.assertTrue(self.in_use(ended.simple_code))
+
+    def test_admin_deactivate_releases_code(self):
+        question = Question.objects.create(text='관리자 종료')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = self.client.post(f'/admin/voting/question/{question.id}/change/', {
+            'text': question.text,
+            'question_type': question.question_type,
+            'creator_session': '',
+            'last_activity_0': question.last_activity.strftime('%Y-%m-%d'),
+            'last_activity_1': question.last_activity.strftime('%H:%M:%S'),
+        }, secure=True)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Question.objects.get(id=question.id).is_active)
+        self.assertFalse(self.in_use(question.simple_code))
+
+    def test_save_and_update_release_codes(self):
+        saved, updated, ended = (Question.objects.create(text=f'질문 {i}') for i in range(3))
+        saved.is_active = False
+        saved.save()
+        self.assertFalse(self.in_use(saved.simple_code))
+
+        # 이미 종료된 질문의 코드는 다른 질문에 할당됐을 수 있으므로 다시 반환하지 않음
+        ended.deactivate()
+        SimpleCode.objects.filter(code=ended.simple_code).update(in_use=True)
+        Question.objects.filter(id__in=[updated.id, ended.id]).update(is_active=False)
+        self.assertFalse(self.in_use(updated.simple_code))
+        self.assertTrue(self.in_use(ended.simple_code))
+
+    def test_cleanup_releases_codes(self):
+        question = Question.objects.create(text='오래된 질문')
+        Question.objects.filter(id=question.id).update(last_activity=timezone.now() - timedelta(hours=1))
+        call_command('cleanup_inactive_questions', stdout=StringIO())
+        self.assertFalse(Question.objects.get(id=question.id).is_active)
+        self.assertFalse(self.in_use(question.simple_code))
+
+
+class LookupCacheTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        # 커밋 콜백을 실행해도 실제 디스패처 스레드가 뜨지 않도록 브로드캐스트 요청은 가로챔
+        patcher = mock.patch.object(vote_broadcaster, 'request')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.question = Question.objects.create(text='테스트 질문')
+        self.code = self.question.simple_code
+
+    def cached_ref(self):
+        ref = lookup.get_question_ref(self.code)
+        with self.assertNumQueries(0):
+            self.assertEqual(lookup.get_question_ref(self.code), ref)
+        return ref
+
+    def test_create_invalidates_cached_miss(self):
+        self.assertIsNone(lookup.get_question_ref('99999'))
+        with self.captureOnCommitCallbacks(execute=True):
+            question = Question.objects.create(text='새 질문', simple_code='99999')
+        self.assertEqual(lookup.get_question_ref('99999').id, question.id)
+
+    def test_toggle_invalidates(self):
+        self.assertFalse(self.cached_ref().show_results)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/toggle-results/{self.question.id}/', secure=True)
+        self.assertTrue(lookup.get_question_ref(self.code).show_results)
+
+    def test_deactivate_invalidates(self):
+        self.assertTrue(self.cached_ref().is_active)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.deactivate()
+        self.assertFalse(lookup.get_question_ref(self.code).is_active)
+
+    def test_cleanup_invalidates(self):
+        self.assertTrue(self.cached_ref().is_active)
+        Question.objects.filter(id=self.question.id).update(last_activity=timezone.now() - timedelta(hours=1))
+        call_command('cleanup_inactive_questions', stdout=StringIO())
+        self.assertFalse(lookup.get_question_ref(self.code).is_active)
+
+
+class CastVoteTests(TestCase):
+    def setUp(self):
+        self.question = Question.objects.create(text='테스트 질문')
+
+    def tallies(self):
+        self.question.refresh_from_db()
+        return self.question.o_count, self.question.x_count, self.question.votes.count()
+
+    def test_duplicate_vote_returns_false(self):
+        self.assertTrue(votes.cast_vote(self.question.id, 'fp1', 'O'))
+        self.assertFalse(votes.cast_vote(self.question.id, 'fp1', 'X'))
+        self.assertTrue(votes.has_voted(self.question.id, 'fp1'))
+        self.assertEqual(self.tallies(), (1, 0, 1))
+
+    def test_racing_insert_returns_false(self):
+        # 다른 프로세스가 같은 기기의 투표를 먼저 저장한 경우 (이 프로세스의 식별자 집합에는 없음)
+        self.assertFalse(votes.has_voted(self.question.id, 'fp1'))
+        Vote.objects.create(question=self.question, choice='O', client_fingerprint='fp1')
+        self.assertFalse(votes.cast_vote(self.question.id, 'fp1', 'X'))
+        self.assertEqual(self.tallies(), (1, 0, 1))
+
+    def test_racing_vote_post_is_not_an_error(self):
+        url = f'/vote/{self.question.id}/'
+        self.assertEqual(self.client.get(url, secure=True).status_code, 200)
+        Vote.objects.create(
+            question=self.question, choice='O', client_fingerprint=votes.make_fingerprint('127.0.0.1', '')
+        )
+
+        response = self.client.post(url, {'choice': 'X'}, secure=True)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.client.post(url, {'choice': 'X'}, secure=True).status_code, 200)
+        self.assertEqual(self.tallies(), (1, 0, 1))
+
+    def test_invalid_choice_rejected(self):
+        with self.assertRaises(ValueError):
+            votes.cast_vote(self.question.id, 'fp1', 'maybe')
+
+
+class ManualVoteBuffer(VoteBuffer):
+    """flush 스레드 없이 테스트가 직접 flush 하는 버퍼 (종료 시 flush도 하지 않음)"""
+
+    def _ensure_worker(self):
+        pass
+
+    def _flush_at_exit(self):
+        pass
+
+
+class VoteBufferTests(TestCase):
+    def setUp(self):
+        self.question = Question.objects.create(text='테스트 질문')
+        self.buffer = ManualVoteBuffer()
+
+    def tallies(self, question):
+        question.refresh_from_db()
+        return question.o_count, question.x_count, question.votes.count()
+
+    def test_flush_saves_and_counts(self):
+        self.assertTrue(self.buffer.submit(self.question.id, 'fp1', 'O'))
+        self.assertFalse(self.buffer.submit(str(self.question.id), 'fp1', 'X'))
+        self.buffer.submit(self.question.id, 'fp2', 'X')
+        self.assertTrue(self.buffer.contains(self.question.id, 'fp2'))
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self.tallies(self.question), (1, 1, 2))
+        self.assertFalse(self.buffer.contains(self.question.id, 'fp2'))
+
+    def test_counts_only_inserted_votes(self):
+        Vote.objects.create(question=self.question, choice='O', client_fingerprint='fp1')
+        self.buffer.submit(self.question.id, 'fp1', 'X')
+        self.buffer.submit(self.question.id, 'fp2', 'O')
+
+        # SAVEPOINT, 질문 확인, 기존 투표 확인, INSERT, 득표수 UPDATE, RELEASE (COUNT 재계산 없음)
+        with self.assertNumQueries(6):
+            self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.tallies(self.question), (2, 0, 2))
+
+    def test_votes_for_deleted_question_are_dropped(self):
+        deleted = Question.objects.create(text='삭제될 질문')
+        self.buffer.submit(self.question.id, 'fp1', 'O')
+        self.buffer.submit(deleted.id, 'fp1', 'X')
+        deleted.delete()
+
+        with self.assertLogs('voting.ingest', 'WARNING'):
+            self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.tallies(self.question), (1, 0, 1))
+
+    def test_failed_flush_keeps_votes(self):
+        self.buffer.submit(self.question.id, 'fp1', 'O')
+        with mock.patch.object(Vote.objects, 'bulk_create', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                self.buffer.flush()
+        self.assertTrue(self.buffer.contains(self.question.id, 'fp1'))
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.tallies(self.question), (1, 0, 1))
+
+    def test_journal_recovers_unsaved_votes(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'votes.journal')
+        crashed = ManualVoteBuffer(journal_path=path)
+        crashed.submit(self.question.id, 'fp1', 'O')
+        crashed.submit(self.question.id, 'fp2', 'X')
+        with open(path, 'a') as journal:
+            journal.write('["truncated')  # 쓰는 도중 종료된 줄
+
+        restarted = ManualVoteBuffer(journal_path=path)
+        with self.assertLogs('voting.ingest', 'WARNING'):
+            self.assertTrue(restarted.contains(self.question.id, 'fp1'))
+        self.assertEqual(restarted.flush(), 2)
+        self.assertEqual(os.path.getsize(path), 0)
+        self.assertEqual(self.tallies(self.question), (1, 1, 2))
+
+        # 저장 후 저널을 정리하기 전에 종료된 경우에도 다시 세지 않음
+        again = ManualVoteBuffer(journal_path=path)
+        with open(path, 'w') as journal:
+            journal.write(json.dumps([str(self.question.id), 'fp1', 'O']) + '\n')
+        self.assertEqual(again.flush(), 0)
+        self.assertEqual(self.tallies(self.question), (1, 1, 2))
+
+
+class ShortAnswerTallyTests(TestCase):
+    def setUp(self):
+        self.question = Question.objects.create(text='테스트 질문', question_type='SHORT_ANSWER')
+
+    def submit(self, text, fingerprint):
+        return ShortAnswerResponse.submit(self.question, text, fingerprint)
+
+    def counts(self):
+        self.question.refresh_from_db()
+        words = dict(ShortAnswerWordCount.objects.filter(question=self.question).values_list('response_text', 'count'))
+        return self.question.response_count, self.question.participant_count, words
+
+    def test_counters_follow_submit_and_delete(self):
+        first = self.submit('사과', 'fp1')
+        self.submit('사과', 'fp2')
+        second = self.submit('배', 'fp1')
+        self.assertEqual(self.counts(), (3, 2, {'사과': 2, '배': 1}))
+
+        second.delete()
+        self.assertEqual(self.counts(), (2, 2, {'사과': 2}))
+        first.delete()
+        self.assertEqual(self.counts(), (1, 1, {'사과': 1}))
+
+    def test_concurrent_first_responses_count_one_participant(self):
+        from .signals import short_answer_created
+        # 같은 참여자의 두 응답이 모두 저장된 뒤에 각 시그널 핸들러가 실행된 경우
+        responses = ShortAnswerResponse.objects.bulk_create([
+            ShortAnswerResponse(question=self.question, response_text='사과', client_fingerprint='fp1'),
+            ShortAnswerResponse(question=self.question, response_text='배', client_fingerprint='fp1'),
+        ])
+        for response in ShortAnswerResponse.objects.filter(id__in=[r.id for r in responses]):
+            short_answer_created(ShortAnswerResponse, response, created=True)
+        self.assertEqual(self.counts(), (2, 1, {'사과': 1, '배': 1}))
+
+    def test_submit_view_updates_counters(self):
+        url = f'/short-answer/vote/{self.question.id}/'
+        response = self.client.post(url, {'response': ' 사과 '}, secure=True)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.counts(), (1, 1, {'사과': 1}))
+
+
+class RebuildTalliesTests(TestCase):
+    def test_restores_corrupted_counters(self):
+        ox = Question.objects.create(text='O/X 질문')
+        for fingerprint, choice in [('fp1', 'O'), ('fp2', 'O'), ('fp3', 'X')]:
+            Vote.objects.create(question=ox, choice=choice, client_fingerprint=fingerprint)
+        short = Question.objects.create(text='단답형 질문', question_type='SHORT_ANSWER')
+        for text, fingerprint in [('사과', 'fp1'), ('사과', 'fp2'), ('배', 'fp1')]:
+            ShortAnswerResponse.submit(short, text, fingerprint)
+
+        Question.objects.update(o_count=7, x_count=0, response_count=9, participant_count=0)
+        ShortAnswerWordCount.objects.filter(response_text='사과').update(count=5)
+
+        call_command('rebuild_tallies', '--dry-run', stdout=StringIO())
+        self.assertEqual(Question.objects.get(id=ox.id).o_count, 7)
+
+        call_command('rebuild_tallies', stdout=StringIO())
+        counters = {question_id: counts for question_id, *counts in Question.objects.values_list(
+            'id', 'o_count', 'x_count', 'response_count', 'participant_count'
+        )}
+        self.assertEqual(counters, {ox.id: [2, 1, 0, 0], short.id: [0, 0, 3, 2]})
+        words = dict(ShortAnswerWordCount.objects.filter(question=short).values_list('response_text', 'count'))
+        self.assertEqual(words, {'사과': 2, '배': 1})
+
+
+class RoomDeltaTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.question_id = 'room-test'
+
+    def publish(self, o_votes, x_votes, show_results=False):
+        frame = rooms.publish('vote_stats', self.question_id, VoteStats(show_results, o_votes, x_votes))
+        return frame and json.loads(frame.text)
+
+    def resume(self, since):
+        frames = async_to_sync(rooms.aresume)('vote_stats', self.question_id, since)
+        return [json.loads(frame.text) for frame in frames]
+
+    def test_deltas_carry_only_changes(self):
+        first = self.publish(0, 0)
+        self.assertEqual(first['type'], 'vote_stats')
+
+        delta = self.publish(1, 0)
+        self.assertEqual(delta, {'type': 'vote_delta', 'v': first['v'] + 1, 'o': 1})
+        self.assertEqual(self.publish(1, 0, show_results=True)['show_results'], True)
+        self.assertIsNone(self.publish(1, 0, show_results=True))
+
+    def test_resume_sends_missed_deltas(self):
+        base = self.publish(0, 0)['v']
+        self.publish(1, 0)
+        self.publish(1, 1)
+
+        self.assertEqual([(f['v'], f.get('o'), f.get('x')) for f in self.resume(base)],
+                         [(base + 1, 1, None), (base + 2, None, 1)])
+        self.assertEqual(self.resume(base + 2), [])
+
+    def test_resume_falls_back_to_snapshot(self):
+        base = self.publish(0, 0)['v']
+        for votes in range(1, rooms.HISTORY_SIZE + 2):
+            self.publish(votes, 0)
+
+        frames = self.resume(base)
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0]['type'], 'vote_stats')
+        self.assertEqual(frames[0]['data']['o_votes'], rooms.HISTORY_SIZE + 1)
+        # 알 수 없는 (더 큰) 버전도 전체 스냅샷
+        self.assertEqual(self.resume(frames[0]['v'] + 100)[0]['type'], 'vote_stats')
+
+
+class SlowClient(LatestStatsMixin):
+    stats_type = 'vote_stats'
+    question_type = 'OX'
+    scope = {}
+    question_id = 'room-test'
+    channel_name = 'slow'
+
+    def __init__(self):
+        self.sent = []
+        self.release = asyncio.Event()
+
+    async def send(self, text_data):
+        await self.release.wait()
+        self.sent.append(text_data)
+
+
+class LatestStatsTests(TestCase):
+    def setUp(self):
+        clear_caches()
+
+    def test_slow_client_gets_latest_snapshot(self):
+        async def scenario():
+            client = SlowClient()
+            client.start_stats_sender()
+            first = rooms.publish('vote_stats', 'room-test', VoteStats(False, 0, 0))
+            client.queue_stats_frame({'text': first.text, 'delta': first.delta})
+            await asyncio.sleep(0)  # 첫 프레임 전송 시작 (release 전까지 밀림)
+            for votes in range(1, 4):
+                frame = rooms.publish('vote_stats', 'room-test', VoteStats(False, votes, 0))
+                client.queue_stats_frame({'text': frame.text, 'delta': frame.delta})
+            client.release.set()
+            await asyncio.sleep(0.05)
+            client.stop_stats_sender()
+            return client
+
+        client = async_to_sync(scenario)()
+        self.assertEqual(client.dropped_frames, 2)
+        self.assertEqual(len(client.sent), 2)
+        latest = json.loads(client.sent[-1])
+        self.assertEqual(latest['type'], 'vote_stats')
+        self.assertEqual(latest['data']['o_votes'], 3)
+
+
+class QRImageTests(TestCase):
+    def test_cached_png_and_not_modified(self):
+        url = '/qr/image/1234/'
+        response = self.client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertTrue(response.content.startswith(b'\x89PNG'))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        etag = response['ETag']
+
+        cached = self.client.get(url, secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], etag)
+        self.assertEqual(cached.content, b'')
+
+        # 크기가 다르면 다른 이미지
+        self.assertNotEqual(self.client.get(f'{url}?size=5', secure=True)['ETag'], etag)
+
+    def test_unknown_code_format_is_404(self):
+        for code in ['abcd', '123', '123456']:
+            self.assertEqual(self.client.get(f'/qr/image/{code}/', secure=True).status_code, 404)
+
+
+class LiveStatsPageTests(TestCase):
+    def test_pages_share_live_stats_script(self):
+        ox = Question.objects.create(text='O/X 질문')
+        short = Question.objects.create(text='단답형 질문', question_type='SHORT_ANSWER')
+        for url in [f'/qr/{ox.id}/', f'/result/{ox.id}/', f'/short-answer/qr/{short.id}/']:
+            response = self.client.get(url, secure=True)
+            self.assertContains(response, '/static/js/live_stats.js')
+            self.assertContains(response, 'createLiveStats(')
+            self.assertNotContains(response, 'function applyStatsMessage')
+
+
+class StatsPollTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.question = Question.objects.create(text='테스트 질문')
+
+    def test_unchanged_poll_is_304_without_queries(self):
+        url = f'/api/stats/{self.question.id}/'
+        response = self.client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, secure=True, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_changed_poll_returns_new_version(self):
+        url = f'/api/stats/{self.question.id}/'
+        etag = self.client.get(url, secure=True)['ETag']
+        rooms.publish('vote_stats', self.question.id, VoteStats(False, 1, 0))
+
+        response = self.client.get(url, secure=True, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(json.loads(response.content)['o_votes'], 1)
+
+
+class FakeChannelLayer:
+    def __init__(self):
+        self.sent = []
+        self.fail = False
+
+    async def group_send(self, group, message):
+        if self.fail:
+            raise ConnectionError('channel layer down')
+        self.sent.append((group, message))
+
+
+class ManualDispatcher(BroadcastDispatcher):
+    """스레드 없이 테스트가 직접 전송을 돌리는 디스패처"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop = asyncio.new_event_loop()
+
+    def _ensure_worker(self):
+        pass
+
+    def run_pending(self):
+        """예정 시각과 관계없이 대기 중인 방을 모두 전송하고 그 방 목록 반환"""
+        with self._cond:
+            for room in self._pending:
+                self._pending[room] = 0
+            due = self._next_due() if self._pending else []
+        for room in due:
+            self._dispatch(room)
+        return due
+
+
+class DispatcherTestCase(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.layer = FakeChannelLayer()
+        patcher = mock.patch('voting.broadcast.get_channel_layer', return_value=self.layer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def dispatcher(self, build_message=build_room_message, **kwargs):
+        dispatcher = ManualDispatcher(build_message, **kwargs)
+        self.addCleanup(dispatcher._loop.close)
+        return dispatcher
+
+    def open_breaker(self, dispatcher):
+        dispatcher.breaker.failures = dispatcher.breaker.threshold
+        dispatcher.breaker.opened_at = time.monotonic()
+
+    def half_open_breaker(self, dispatcher):
+        dispatcher.breaker.opened_at -= dispatcher.breaker.reset_timeout
+
+
+class BroadcastDispatcherTests(DispatcherTestCase):
+    def setUp(self):
+        super().setUp()
+        self.state = {}
+        self.builds = []
+
+    def build(self, room):
+        self.builds.append(room)
+        if room not in self.state:
+            return None
+        return f'group_{room}', {'type': 'vote_stats', 'value': self.state[room]}
+
+    def test_requests_coalesce_per_room(self):
+        dispatcher = self.dispatcher(self.build)
+        self.state.update(a=1, b=1)
+        for _ in range(5):
+            dispatcher.request('a')
+        dispatcher.request('b')
+
+        self.assertEqual(dispatcher.run_pending(), ['a', 'b'])
+        self.assertEqual(self.builds, ['a', 'b'])
+        self.assertEqual([group for group, _ in self.layer.sent], ['group_a', 'group_b'])
+
+    def test_final_state_after_interval(self):
+        dispatcher = self.dispatcher(self.build, interval=10)
+        self.state['a'] = 1
+        dispatcher.request('a')
+        dispatcher.run_pending()
+
+        # 간격 안에 들어온 요청은 버리지 않고 간격이 끝날 때로 미룸
+        self.state['a'] = 2
+        dispatcher.request('a')
+        dispatcher.request('a')
+        self.assertGreater(dispatcher._pending['a'], time.monotonic() + 5)
+        dispatcher.run_pending()
+        self.assertEqual([message['value'] for _, message in self.layer.sent], [1, 2])
+
+    def test_none_message_is_not_sent(self):
+        dispatcher = self.dispatcher(self.build)
+        dispatcher.request('missing')
+        dispatcher.run_pending()
+        self.assertEqual(self.builds, ['missing'])
+        self.assertEqual(self.layer.sent, [])
+
+    def test_build_error_retries_with_backoff(self):
+        failures = [OperationalError('database is locked')]
+
+        def build(room):
+            if failures:
+                raise failures.pop()
+            return self.build(room)
+
+        dispatcher = self.dispatcher(build, interval=0)
+        self.state['a'] = 1
+        errors = counter_value(metrics.broadcast_build_errors)
+        dispatcher.request('a')
+        with self.assertLogs('voting.broadcast', 'ERROR'):
+            dispatcher.run_pending()
+
+        # 실패한 방은 버리지 않고 backoff 후 다시 예약됨
+        self.assertGreater(dispatcher._pending['a'], time.monotonic())
+        self.assertEqual(counter_value(metrics.broadcast_build_errors), errors + 1)
+        dispatcher.run_pending()
+        self.assertEqual(self.layer.sent, [('group_a', {'type': 'vote_stats', 'value': 1})])
+        self.assertNotIn('a', dispatcher._build_failures)
+
+
+class CircuitBreakerTests(TestCase):
+    def test_open_half_open_close(self):
+        breaker = CircuitBreaker(threshold=2, reset_timeout=10)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        with self.assertLogs('voting.broadcast', 'WARNING'):
+            breaker.record_failure()
+        self.assertTrue(breaker.is_open)
+        self.assertFalse(breaker.allow())
+
+        # reset_timeout이 지나면 시험 전송 허용, 실패하면 다시 열림
+        breaker.opened_at -= 10
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        breaker.opened_at -= 10
+        with self.assertLogs('voting.broadcast', 'INFO'):
+            breaker.record_success()
+        self.assertFalse(breaker.is_open)
+        self.assertIsNone(breaker.retry_at())
+
+
+class BroadcastSchedulingTests(TestCase):
+    def setUp(self):
+        self.question = Question.objects.create(text='테스트 질문')
+        self.room = ('vote_stats', str(self.question.id))
+
+    def test_requested_after_commit(self):
+        with mock.patch.object(vote_broadcaster, 'request') as request:
+            with self.captureOnCommitCallbacks() as callbacks:
+                Vote.objects.create(question=self.question, choice='O', client_fingerprint='fp1')
+                request.assert_not_called()
+            for callback in callbacks:
+                callback()
+        request.assert_called_once_with(self.room)
+
+    def test_toggle_broadcasts_once(self):
+        with mock.patch.object(vote_broadcaster, 'request') as request:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(f'/api/toggle-results/{self.question.id}/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        request.assert_called_once_with(self.room)
+
+
+class BroadcastOutageTests(DispatcherTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = Question.objects.create(text='테스트 질문')
+        self.room = ('vote_stats', str(self.question.id))
+
+    def test_snapshot_published_while_breaker_open(self):
+        dispatcher = self.dispatcher()
+        self.open_breaker(dispatcher)
+        Vote.objects.create(question=self.question, choice='O', client_fingerprint='fp1')
+        Vote.objects.create(question=self.question, choice='X', client_fingerprint='fp2')
+        dispatcher.request(self.room)
+        dispatcher.run_pending()
+
+        self.assertEqual(self.layer.sent, [])
+        # HTTP 폴링 폴백은 장애 중에도 최신 집계를 받음
+        data = json.loads(self.client.get(f'/api/stats/{self.question.id}/', secure=True).content)
+        self.assertEqual((data['o_votes'], data['x_votes']), (1, 1))
+
+        # 브레이커가 시험 전송을 허용하면 바뀐 것이 없어도 보내지 못한 최종 상태를 보냄
+        self.half_open_breaker(dispatcher)
+        self.assertEqual(dispatcher.run_pending(), [self.room])
+        self.assertEqual(len(self.layer.sent), 1)
+        self.assertEqual(json.loads(self.layer.sent[0][1]['text'])['data']['o_votes'], 1)
+        self.assertFalse(dispatcher.breaker.is_open)
+        self.assertEqual(dispatcher.run_pending(), [])
+
+    def test_failed_send_is_retried(self):
+        dispatcher = self.dispatcher()
+        dispatcher.breaker.threshold = 1
+        self.layer.fail = True
+        dispatcher.request(self.room)
+        with self.assertLogs('voting.broadcast', 'ERROR'):
+            dispatcher.run_pending()
+        self.assertTrue(dispatcher.breaker.is_open)
+
+        self.layer.fail = False
+        self.half_open_breaker(dispatcher)
+        dispatcher.run_pending()
+        self.assertEqual([group for group, _ in self.layer.sent], [f'vote_{self.question.id}'])
+
+    def test_full_queue_defers_rooms(self):
+        dispatcher = self.dispatcher(lambda room: ('group', {'type': 'vote_stats', 'room': room}), maxsize=1)
+        dispatcher.request('a')
+        with self.assertLogs('voting.broadcast', 'WARNING'):
+            dispatcher.request('b')
+        dispatcher.request('b')
+
+        self.assertEqual(dispatcher.run_pending(), ['a'])
+        self.assertEqual(dispatcher.run_pending(), ['b'])
+        self.assertEqual([message['room'] for _, message in self.layer.sent], ['a', 'b'])
+        self.assertEqual(dispatcher.deferred, 1)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class SocketTestCase(TransactionTestCase):
+    """oxvote.asgi 애플리케이션에 WebSocket으로 접속하는 테스트 (브로드캐스트 요청은 기록만 함)"""
+
+    def setUp(self):
+        clear_caches()
+        patcher = mock.patch.object(vote_broadcaster, 'request')
+        self.broadcast_requests = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def socket(self, path, origin=b'https://oxit.run'):
+        from oxvote.asgi import application
+        return WebsocketCommunicator(application, path, headers=[(b'origin', origin), (b'user-agent', b'test')])
+
+
+class VoteSocketTests(SocketTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = Question.objects.create(text='테스트 질문')
+        self.path = f'/ws/vote/{self.question.id}/'
+
+    def test_cross_origin_socket_rejected(self):
+        async def scenario():
+            connected, _ = await self.socket(self.path, origin=b'https://evil.example').connect()
+            return connected
+
+        self.assertFalse(async_to_sync(scenario)())
+
+    def test_cast_vote_replies(self):
+        async def scenario():
+            socket = self.socket(self.path)
+            connected, _ = await socket.connect()
+            self.assertTrue(connected)
+            await socket.receive_json_from()  # 접속 시 통계
+
+            replies = []
+            for choice in ['maybe', 'O', 'X']:
+                await socket.send_json_to({'type': 'cast_vote', 'choice': choice})
+                replies.append(await socket.receive_json_from())
+            await Question.objects.filter(id=self.question.id).aupdate(is_active=False)
+            await socket.send_json_to({'type': 'cast_vote', 'choice': 'O'})
+            replies.append(await socket.receive_json_from())
+            await socket.disconnect()
+            return replies
+
+        replies = async_to_sync(scenario)()
+        self.assertEqual([reply['type'] for reply in replies], ['vote_result'] * 4)
+        self.assertEqual([reply['status'] for reply in replies], ['invalid', 'created', 'already_voted', 'inactive'])
+        self.assertEqual(replies[1]['data']['o_votes'], 1)
+        self.assertEqual(list(Vote.objects.filter(question=self.question).values_list('choice', flat=True)), ['O'])
+
+    def test_unacked_client_gets_latest_frame(self):
+        room = ('vote_stats', str(self.question.id))
+        dropped = counter_value(metrics.stats_frames_dropped, 'OX')
+
+        async def vote(fingerprint):
+            await sync_to_async(Vote.objects.create)(question=self.question, choice='O', client_fingerprint=fingerprint)
+            await get_channel_layer().group_send(*await sync_to_async(build_room_message)(room))
+
+        async def scenario():
+            socket = self.socket(f'{self.path}?ack=1')
+            await socket.connect()
+            await socket.receive_json_from()  # 접속 시 통계
+            await vote('fp-0')
+            first = await socket.receive_json_from()
+
+            # ack 전에는 보내지 않고 들어온 프레임은 하나로 합침
+            for i in range(1, 4):
+                await vote(f'fp-{i}')
+            self.assertTrue(await socket.receive_nothing())
+            await socket.send_json_to({'type': 'ack', 'v': first['v']})
+            latest = await socket.receive_json_from()
+            await socket.disconnect()
+            return first, latest
+
+        first, latest = async_to_sync(scenario)()
+        self.assertEqual(first['type'], 'vote_delta')
+        # 버린 델타 대신 방의 최신 스냅샷을 보냄
+        self.assertEqual(latest['type'], 'vote_stats')
+        self.assertEqual(latest['data']['o_votes'], 4)
+        self.assertEqual(counter_value(metrics.stats_frames_dropped, 'OX'), dropped + 2)
+
+
+class ShortAnswerSocketTests(SocketTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = Question.objects.create(text='단답형 질문', question_type='SHORT_ANSWER')
+
+    def test_submission_pushes_stats(self):
+        async def scenario():
+            socket = self.socket(f'/ws/short-answer/{self.question.id}/')
+            connected, _ = await socket.connect()
+            self.assertTrue(connected)
+            initial = await socket.receive_json_from()  # 접속 시 통계
+
+            response = await sync_to_async(self.client.post)(
+                f'/short-answer/vote/{self.question.id}/', {'response': '사과'}, secure=True
+            )
+            self.assertEqual(response.status_code, 302)
+            # 커밋 후 요청된 방을 디스패처처럼 전송
+            room = self.broadcast_requests.call_args.args[0]
+            await get_channel_layer().group_send(*await sync_to_async(build_room_message)(room))
+            pushed = await socket.receive_json_from()
+            await socket.disconnect()
+            return room, initial, pushed
+
+        room, initial, pushed = async_to_sync(scenario)()
+        self.assertEqual(room, ('short_answer_stats', str(self.question.id)))
+        self.assertEqual(pushed['type'], 'short_answer_stats')
+        self.assertGreater(pushed['v'], initial['v'])
+        self.assertEqual(pushed['data']['total_responses'], 1)
+        self.assertEqual(pushed['data']['word_data'], [{'response_text': '사과', 'count': 1}])
+
+
+class StatsEventsTests(SocketTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = Question.objects.create(text='테스트 질문')
+        self.room = ('vote_stats', str(self.question.id))
+
+    async def open_stream(self, last_event_id=None):
+        from oxvote.asgi import application
+        headers = [(b'host', b'localhost'), (b'x-forwarded-proto', b'https')]
+        if last_event_id is not None:
+            headers.append((b'last-event-id', str(last_event_id).encode()))
+        stream = ApplicationCommunicator(application, {
+            'type': 'http', 'http_version': '1.1', 'method': 'GET', 'scheme': 'https',
+            'path': f'/api/events/{self.question.id}/', 'query_string': b'', 'headers': headers,
+        })
+        await stream.send_input({'type': 'http.request', 'body': b''})
+        start = await stream.receive_output(5)
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'Content-Type', b'text/event-stream'), start['headers'])
+        self.assertEqual(await self.next_event(stream), 'retry: 3000\n\n')
+        return stream
+
+    async def next_event(self, stream):
+        return (await stream.receive_output(5))['body'].decode()
+
+    def parse(self, event):
+        lines = dict(line.split(': ', 1) for line in event.strip().split('\n'))
+        return int(lines['id']), json.loads(lines['data'])
+
+    async def close(self, stream):
+        stream.future.cancel()
+        await asyncio.gather(stream.future, return_exceptions=True)
+
+    async def vote(self, fingerprint, choice):
+        """투표를 저장하고 디스패처처럼 방 메시지를 만들어 반환"""
+        await sync_to_async(Vote.objects.create)(question=self.question, choice=choice, client_fingerprint=fingerprint)
+        return await sync_to_async(build_room_message)(self.room)
+
+    def test_stream_and_resume(self):
+        async def scenario():
+            stream = await self.open_stream()
+            version, frame = self.parse(await self.next_event(stream))
+            self.assertEqual(frame['type'], 'vote_stats')
+
+            # 브로드캐스트는 델타 프레임으로 이벤트 id(방 버전)와 함께 전달
+            group, message = await self.vote('fp1', 'O')
+            await get_channel_layer().group_send(group, message)
+            self.assertEqual(self.parse(await self.next_event(stream)), (version + 1, {
+                'type': 'vote_delta', 'v': version + 1, 'o': 1,
+            }))
+            await self.close(stream)
+
+            # 끊긴 동안의 변경은 Last-Event-ID 이후 델타만 받음
+            await self.vote('fp2', 'X')
+            stream = await self.open_stream(last_event_id=version + 1)
+            self.assertEqual(self.parse(await self.next_event(stream)), (version + 2, {
+                'type': 'vote_delta', 'v': version + 2, 'x': 1,
+            }))
+            await self.close(stream)
+
+            # 이어 줄 수 없는 버전이면 전체 스냅샷
+            stream = await self.open_stream(last_event_id=version - 1)
+            snapshot_version, snapshot = self.parse(await self.next_event(stream))
+            await self.close(stream)
+            return snapshot_version - version, snapshot
+
+        versions_ahead, snapshot = async_to_sync(scenario)()
+        self.assertEqual(versions_ahead, 2)
+        self.assertEqual(snapshot['type'], 'vote_stats')
+        self.assertEqual((snapshot['data']['o_votes'], snapshot['data']['x_votes']), (1, 1))
+
+
+class PresenceSocketTests(SocketTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = Question.objects.create(text='테스트 질문')
+        self.room = ('presence', str(self.question.id))
+
+    async def broadcast_presence(self):
+        """디스패처처럼 접속자 수 메시지를 만들어 전송"""
+        built = await sync_to_async(build_room_message)(self.room)
+        if built is not None:
+            await get_channel_layer().group_send(*built)
+
+    def test_presenter_receives_counts(self):
+        async def scenario():
+            presenter = self.socket(f'/ws/vote/{self.question.id}/?role=presenter')
+            await presenter.connect()
+            self.assertEqual((await presenter.receive_json_from())['type'], 'vote_stats')
+            counts = [await presenter.receive_json_from()]
+
+            participant = self.socket(f'/ws/vote/{self.question.id}/')
+            await participant.connect()
+            await participant.receive_json_from()
+            await self.broadcast_presence()
+            counts.append(await presenter.receive_json_from())
+            # 참여자 소켓은 접속자 수 프레임을 받지 않음
+            self.assertTrue(await participant.receive_nothing())
+
+            await participant.disconnect()
+            await self.broadcast_presence()
+            counts.append(await presenter.receive_json_from())
+            await presenter.disconnect()
+            return counts
+
+        counts = async_to_sync(scenario)()
+        self.assertEqual(counts, [{'type': 'presence', 'count': count} for count in (0, 1, 0)])
+        self.broadcast_requests.assert_any_call(self.room)
+
+
+class MetricsTests(TestCase):
+    def test_histogram_text_format(self):
+        histogram = metrics.Histogram('test_seconds', '테스트', ['view'], buckets=(0.1, 1))
+        metrics._registry.remove(histogram)
+        histogram.observe(0.05, 'home')
+        histogram.observe(0.5, 'home')
+        text = histogram.render()
+
+        self.assertIn('# TYPE test_seconds histogram', text)
+        self.assertIn('test_seconds_bucket{view="home",le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{view="home",le="1"} 2', text)
+        self.assertIn('test_seconds_bucket{view="home",le="+Inf"} 2', text)
+        self.assertIn('test_seconds_count{view="home"} 2', text)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_request_metrics_by_url_name(self):
+        question = Question.objects.create(text='테스트 질문')
+        self.client.get(f'/api/stats/{question.id}/', secure=True)
+
+        text = self.client.get('/metrics', secure=True, headers={'Authorization': 'Bearer secret'}).content.decode()
+        self.assertIn('oxvote_http_request_duration_seconds_count{view="vote_stats"}', text)
+        self.assertRegex(text, r'oxvote_http_request_db_queries_sum\{view="vote_stats"\} [1-9]')
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_required(self):
+        for url in ['/metrics', '/metrics/traces']:
+            self.assertEqual(self.client.get(url, secure=True).status_code, 403)
+            response = self.client.get(url, secure=True, headers={'Authorization': 'Bearer secret'})
+            self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_hidden_without_token_unless_debug(self):
+        for url in ['/metrics', '/metrics/traces']:
+            self.assertEqual(self.client.get(url, secure=True).status_code, 404)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get('/metrics', secure=True).status_code, 200)
+
+
+@override_settings(PROFILER_SLOW_MS=10000, PROFILER_REPEATED_QUERY_THRESHOLD=3, PROFILER_SAMPLE_RATE=1)
+class ProfilerTests(TestCase):
+    def setUp(self):
+        profiler.install()
+        profiler._traces.clear()
+        self.question = Question.objects.create(text='테스트 질문')
+
+    def profile(self, func):
+        request = RequestFactory().get(f'/vote/{self.question.id}/')
+        request.resolver_match = resolve(request.path)
+        with profiler.profile_request(request) as trace:
+            func()
+        return trace
+
+    def test_repeated_queries_are_logged(self):
+        def n_plus_one():
+            for _ in range(3):
+                Question.objects.get(id=self.question.id)
+
+        with self.assertLogs('voting.profiler', 'WARNING') as logs:
+            trace = self.profile(n_plus_one)
+
+        self.assertEqual(len(trace.queries), 3)
+        self.assertIn('Repeated queries', logs.output[0])
+        self.assertEqual(trace.repeated_queries(3)[0]['count'], 3)
+
+    def test_sampled_trace_is_exported(self):
+        self.profile(lambda: Question.objects.filter(id=self.question.id).exists())
+
+        traces = profiler.export_traces()
+        self.assertEqual(len(traces), 1)
+        self.assertEqual(traces[0]['view'], 'vote_page')
+        self.assertEqual(traces[0]['queries'], 1)
+        self.assertEqual(len(traces[0]['sql']), 1)
+
+
+class PresenceTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.question = Question.objects.create(text='테스트 질문')
+
+    def test_join_and_leave(self):
+        bucket = presence.join(self.question.id)
+        presence.join(self.question.id)
+        self.assertEqual(presence.count(self.question.id), 0)  # flush 전에는 캐시에 없음
+        presence.flush(self.question.id)
+        self.assertEqual(presence.count(self.question.id), 2)
+
+        presence.leave(self.question.id, [bucket])
+        presence.flush(self.question.id)
+        self.assertEqual(presence.count(self.question.id), 1)
+
+    def at(self, buckets):
+        """시작 시각에서 buckets 버킷만큼 지난 시각으로 time.time 고정 (캐시 만료 시각도 함께)"""
+        return mock.patch('time.time', return_value=self.started + buckets * presence.heartbeat_interval())
+
+    def test_missed_heartbeats_expire(self):
+        self.started = 1000 * presence.heartbeat_interval() + 1
+        with self.at(0):
+            bucket = presence.join(self.question.id)
+            presence.join(self.question.id)
+            presence.flush(self.question.id)
+            self.assertEqual(presence.count(self.question.id), 2)
+        with self.at(1):
+            # 다음 버킷에서는 하트비트를 보낸 소켓 하나만 다시 기록
+            presence.join(self.question.id)
+            presence.flush(self.question.id)
+            self.assertEqual(presence.count(self.question.id), 2)
+        with self.at(2):
+            # 하트비트가 끊긴 소켓은 두 버킷 뒤에 빠짐
+            self.assertEqual(presence.count(self.question.id), 1)
+        with self.at(presence.bucket_timeout() / presence.heartbeat_interval() + 0.1):
+            self.assertIsNone(rooms.cache.get(presence.cache_key(self.question.id, bucket)))
+
+    def test_api_reads_count(self):
+        presence.join(self.question.id)
+        presence.flush(self.question.id)
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/presence/{self.question.id}/', secure=True)
+        self.assertEqual(json.loads(response.content), {'count': 1})
+
+    def test_broadcast_only_when_changed(self):
+        from .signals import build_room_message
+        room = ('presence', str(self.question.id))
+        presence.join(self.question.id)
+
+        group, message = build_room_message(room)
+        self.assertEqual(group, f'presence_{self.question.id}')
+        self.assertEqual(json.loads(message['text']), {'type': 'presence', 'count': 1})
+        self.assertIsNone(build_room_message(room))
 
-# Create your tests here.
@@ -6,6 +6,10 @@ urlpatterns = [
     # 정적 페이지 (간단한 코드 패턴보다 먼저 정의)
     path('privacy/', views.privacy, name='privacy'),
     path('ads.txt', views.ads_txt, name='ads_txt'),
+    path('metrics', views.metrics_view, name='metrics'),
+    path('metrics/traces', views.profiler_traces, name='profiler_traces'),
+    # QR 코드 이미지 (캐시 가능)
+    path('qr/image/<str:simple_code>/', views.qr_image, name='qr_image'),
     # UUID 기반 URL - O/X 투표
     path('qr/<uuid:question_id>/', views.qr_page, name='qr_page'),
     path('vote/<uuid:question_id>/', views.vote_page, name='vote_page'),
@@ -13,6 +17,8 @@ urlpatterns = [
     path('api/toggle-results/<uuid:question_id>/', views.toggle_results, name='toggle_results'),
     path('api/stats/<uuid:question_id>/', views.get_vote_stats, name='vote_stats'),
     path('api/end-vote/<uuid:question_id>/', views.end_vote, name='end_vote'),
+    path('api/events/<uuid:question_id>/', views.stats_events, name='stats_events'),
+    path('api/presence/<uuid:question_id>/', views.room_presence, name='room_presence'),
     # UUID 기반 URL - 단답형
     path('short-answer/qr/<uuid:question_id>/', views.short_answer_qr_page, name='short_answer_qr_page'),
     path('short-answer/vote/<uuid:question_id>/', views.short_answer_vote_page, name='short_answer_vote_page'),
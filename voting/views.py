@@ -1,17 +1,28 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, Http404, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Count
+from django.utils.crypto import constant_time_compare
+from django.conf import settings
 import json
-import qrcode
 import re
-from io import BytesIO
-import base64
-import hashlib
-from .models import Question, Vote, ShortAnswerResponse
+from asgiref.sync import sync_to_async
+from .models import Question, ShortAnswerResponse
+from . import stats as vote_stats
+from . import qr
+from . import lookup
+from . import votes
+from . import rooms
+from . import sse
+from . import metrics
+from . import profiler
+from . import presence
+
+# 롱폴링 최대 대기 시간 (초, 프록시 타임아웃보다 짧게)
+LONG_POLL_MAX_WAIT = 25
 
 def get_client_fingerprint(request):
     """클라이언트 고유 식별자를 생성합니다 (IP + User-Agent 조합)"""
@@ -24,24 +35,92 @@ def get_client_fingerprint(request):
     user_agent = request.META.get('HTTP_USER_AGENT', '')
     
     # IP + User-Agent를 조합하여 고유한 해시 생성
-    fingerprint_string = f"{ip}:{user_agent}"
-    fingerprint = hashlib.md5(fingerprint_string.encode()).hexdigest()
+    return votes.make_fingerprint(ip, user_agent)
+
+def get_question_ref_by_code(simple_code, require_active=True):
+    """간단한 코드로 질문 요약 정보(id, 유형, 활성 여부, 결과 공개 여부)를 캐시에서 찾습니다"""
+    if not re.match(r'^\d{4,5}$', simple_code):
+        return None
     
-    return fingerprint
+    ref = lookup.get_question_ref(simple_code)
+    if ref is None or (require_active and not ref.is_active):
+        return None
+    return ref
 
 def get_question_by_code(simple_code, require_active=True):
     """간단한 코드로 질문을 찾습니다"""
-    if not re.match(r'^\d{4}$', simple_code):
+    ref = get_question_ref_by_code(simple_code, require_active)
+    if ref is None:
         return None
     
     try:
-        if require_active:
-            return Question.objects.get(simple_code=simple_code, is_active=True)
-        else:
-            return Question.objects.get(simple_code=simple_code)
+        return Question.objects.get(id=ref.id)
+    except Question.DoesNotExist:
+        return None
+
+async def aget_question_ref_by_code(simple_code, require_active=True):
+    """get_question_ref_by_code의 비동기 버전"""
+    if not re.match(r'^\d{4,5}$', simple_code):
+        return None
+    
+    ref = await lookup.aget_question_ref(simple_code)
+    if ref is None or (require_active and not ref.is_active):
+        return None
+    return ref
+
+async def aget_question_by_code(simple_code, require_active=True):
+    """get_question_by_code의 비동기 버전"""
+    ref = await aget_question_ref_by_code(simple_code, require_active)
+    if ref is None:
+        return None
+    
+    try:
+        return await Question.objects.aget(id=ref.id)
     except Question.DoesNotExist:
         return None
 
+# 템플릿(base.html의 messages)이 세션을 읽으므로 비동기 뷰의 렌더링은 스레드에서 실행
+arender = sync_to_async(render)
+
+def stats_response(stats):
+    """미리 직렬화된 통계 스냅샷(O/X, 단답형)으로 JSON 응답 생성"""
+    return HttpResponse(stats.json, content_type='application/json')
+
+def stats_etag(version):
+    return f'"v{version}"'
+
+def etag_version(request):
+    """If-None-Match 헤더의 통계 버전 (없거나 형식이 다르면 None)"""
+    match = re.fullmatch(r'(?:W/)?"v(\d+)"', request.META.get('HTTP_IF_NONE_MATCH', '').strip())
+    return int(match.group(1)) if match else None
+
+async def room_stats_response(request, message_type, question_id):
+    """방의 마지막 스냅샷으로 통계 응답 (ETag 포함, 질문이 없으면 None)
+
+    If-None-Match의 버전이 현재와 같으면 ?wait=초 동안 방이 바뀌기를 기다리고,
+    끝까지 그대로면 304를 반환한다. 바뀌었는지는 캐시된 스냅샷으로만 판단한다.
+    """
+    try:
+        wait = int(request.GET.get('wait', 0))
+    except ValueError:
+        wait = 0
+    wait = min(max(wait, 0), LONG_POLL_MAX_WAIT)
+    
+    known_version = etag_version(request)
+    if known_version is None:
+        wait = 0
+    snapshot = await rooms.await_change(message_type, question_id, known_version, wait)
+    if snapshot is None:
+        return None
+    
+    etag = stats_etag(snapshot.version)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = stats_response(snapshot.stats)
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
 def update_session_activity(request, question):
     """세션 활동 업데이트"""
     if not request.session.session_key:
@@ -89,52 +168,35 @@ def qr_page(request, question_id):
     # 세션 활동 업데이트
     update_session_activity(request, question)
     
-    # QR 코드 생성 (간단한 코드 사용)
-    vote_url = request.build_absolute_uri(f'/{question.simple_code}/')
-    simple_url = f"{request.get_host()}/{question.simple_code}"
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(vote_url)
-    qr.make(fit=True)
-    
-    # QR 코드를 이미지로 변환
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffer = BytesIO()
-    img.save(buffer, format='PNG')
-    buffer.seek(0)
-    
-    # Base64로 인코딩
-    qr_code_b64 = base64.b64encode(buffer.getvalue()).decode()
-    
+    # QR 코드 이미지는 qr_image 엔드포인트에서 캐시와 함께 별도로 제공
     context = {
         'question': question,
-        'qr_code': qr_code_b64,
-        'vote_url': vote_url,
-        'simple_url': simple_url,
+        'vote_url': request.build_absolute_uri(f'/{question.simple_code}/'),
+        'simple_url': f"{request.get_host()}/{question.simple_code}",
     }
     
     return render(request, 'voting/qr_page.html', context)
 
-def vote_page(request, question_id):
+async def vote_page(request, question_id):
     """투표 페이지"""
-    question = get_object_or_404(Question, id=question_id)
+    try:
+        question = await Question.objects.aget(id=question_id)
+    except Question.DoesNotExist:
+        raise Http404
     
     # 비활성 투표 체크
     if not question.is_active:
-        return render(request, 'voting/inactive_vote.html', {'question': question})
+        return await arender(request, 'voting/inactive_vote.html', {'question': question})
     
     client_fingerprint = get_client_fingerprint(request)
     
     # 이미 투표했는지 확인
-    already_voted = Vote.objects.filter(question=question, client_fingerprint=client_fingerprint).exists()
+    already_voted = await votes.ahas_voted(question.id, client_fingerprint)
     
     if request.method == 'POST' and not already_voted:
         choice = request.POST.get('choice')
-        if choice in ['O', 'X']:
-            Vote.objects.create(
-                question=question,
-                choice=choice,
-                client_fingerprint=client_fingerprint
-            )
+        if choice in votes.VALID_CHOICES:
+            await votes.acast_vote(question.id, client_fingerprint, choice)
             return redirect('vote_result', question_id=question_id)
     
     context = {
@@ -142,7 +204,7 @@ def vote_page(request, question_id):
         'already_voted': already_voted,
     }
     
-    return render(request, 'voting/vote_page.html', context)
+    return await arender(request, 'voting/vote_page.html', context)
 
 def vote_result(request, question_id):
     """투표 결과 페이지"""
@@ -160,60 +222,70 @@ def toggle_results(request, question_id):
     """결과 보이기/숨기기 토글"""
     question = get_object_or_404(Question, id=question_id)
     question.show_results = not question.show_results
-    question.save()
+    question.save(update_fields=['show_results'])
     
-    return JsonResponse({
-        'show_results': question.show_results,
-        'o_percentage': question.o_percentage,
-        'x_percentage': question.x_percentage,
-        'total_votes': question.total_votes,
-    })
+    return stats_response(vote_stats.VoteStats.from_question(question))
 
-def get_vote_stats(request, question_id):
-    """실시간 투표 통계 API"""
-    question = get_object_or_404(Question, id=question_id)
+async def get_vote_stats(request, question_id):
+    """실시간 투표 통계 API (ETag, ?wait= 롱폴링 지원)"""
+    response = await room_stats_response(request, 'vote_stats', question_id)
+    if response is None:
+        raise Http404
     
-    return JsonResponse({
-        'show_results': question.show_results,
-        'o_percentage': question.o_percentage,
-        'x_percentage': question.x_percentage,
-        'total_votes': question.total_votes,
-        'o_votes': question.o_votes,
-        'x_votes': question.x_votes,
-    })
+    return response
+
+async def stats_events(request, question_id):
+    """실시간 통계 Server-Sent Events 스트림 (O/X, 단답형 모두, WebSocket을 쓸 수 없을 때)"""
+    question_type = await Question.objects.filter(id=question_id).values_list(
+        'question_type', flat=True
+    ).afirst()
+    if question_type is None:
+        raise Http404
+    
+    message_type = 'short_answer_stats' if question_type == 'SHORT_ANSWER' else 'vote_stats'
+    # EventSource 자동 재접속은 Last-Event-ID, 페이지에서 새로 여는 경우는 ?v=로 마지막 버전을 보냄
+    since = request.META.get('HTTP_LAST_EVENT_ID') or request.GET.get('v')
+    try:
+        since = int(since) if since else None
+    except ValueError:
+        since = None
+    
+    response = StreamingHttpResponse(
+        sse.stats_events(message_type, question_id, since, presenter=request.GET.get('role') == 'presenter'),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # 프록시 버퍼링 끄기
+    return response
 
 # --- 간단한 코드 기반 뷰들 ---
 
-def vote_by_code(request, simple_code):
+async def vote_by_code(request, simple_code):
     """간단한 코드로 투표 페이지 접근"""
     # 먼저 질문이 존재하는지 확인 (활성/비활성 상관없이)
-    question = get_question_by_code(simple_code, require_active=False)
+    question = await aget_question_by_code(simple_code, require_active=False)
     
     if question is None:
         # 존재하지 않는 코드
-        return render(request, 'voting/vote_not_found.html', {'searched_code': simple_code})
+        return await arender(request, 'voting/vote_not_found.html', {'searched_code': simple_code})
     
     if not question.is_active:
         # 비활성 투표
-        return render(request, 'voting/inactive_vote.html', {'question': question})
+        return await arender(request, 'voting/inactive_vote.html', {'question': question})
     
     # 단답형이면 단답형 페이지로 리다이렉트
     if question.question_type == 'SHORT_ANSWER':
-        return short_answer_vote_by_code(request, simple_code)
+        return await sync_to_async(short_answer_vote_by_code)(request, simple_code)
     
     client_fingerprint = get_client_fingerprint(request)
     
     # 이미 투표했는지 확인
-    already_voted = Vote.objects.filter(question=question, client_fingerprint=client_fingerprint).exists()
+    already_voted = await votes.ahas_voted(question.id, client_fingerprint)
     
     if request.method == 'POST' and not already_voted:
         choice = request.POST.get('choice')
-        if choice in ['O', 'X']:
-            Vote.objects.create(
-                question=question,
-                choice=choice,
-                client_fingerprint=client_fingerprint
-            )
+        if choice in votes.VALID_CHOICES:
+            await votes.acast_vote(question.id, client_fingerprint, choice)
             return redirect('vote_result_by_code', simple_code=simple_code)
     
     context = {
@@ -221,7 +293,7 @@ def vote_by_code(request, simple_code):
         'already_voted': already_voted,
     }
     
-    return render(request, 'voting/vote_page.html', context)
+    return await arender(request, 'voting/vote_page.html', context)
 
 def qr_page_by_code(request, simple_code):
     """간단한 코드로 QR 페이지 접근"""
@@ -239,27 +311,11 @@ def qr_page_by_code(request, simple_code):
     # 세션 활동 업데이트
     update_session_activity(request, question)
     
-    # QR 코드 생성 (간단한 코드 사용)
-    vote_url = request.build_absolute_uri(f'/{question.simple_code}/')
-    simple_url = f"{request.get_host()}/{question.simple_code}"
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(vote_url)
-    qr.make(fit=True)
-    
-    # QR 코드를 이미지로 변환
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffer = BytesIO()
-    img.save(buffer, format='PNG')
-    buffer.seek(0)
-    
-    # Base64로 인코딩
-    qr_code_b64 = base64.b64encode(buffer.getvalue()).decode()
-    
+    # QR 코드 이미지는 qr_image 엔드포인트에서 캐시와 함께 별도로 제공
     context = {
         'question': question,
-        'qr_code': qr_code_b64,
-        'vote_url': vote_url,
-        'simple_url': simple_url,
+        'vote_url': request.build_absolute_uri(f'/{question.simple_code}/'),
+        'simple_url': f"{request.get_host()}/{question.simple_code}",
     }
     
     return render(request, 'voting/qr_page.html', context)
@@ -299,33 +355,25 @@ def toggle_results_by_code(request, simple_code):
     update_session_activity(request, question)
     
     question.show_results = not question.show_results
-    question.save()
+    question.save(update_fields=['show_results'])
     
-    return JsonResponse({
-        'show_results': question.show_results,
-        'o_percentage': question.o_percentage,
-        'x_percentage': question.x_percentage,
-        'total_votes': question.total_votes,
-    })
+    return stats_response(vote_stats.VoteStats.from_question(question))
 
-def get_vote_stats_by_code(request, simple_code):
+async def get_vote_stats_by_code(request, simple_code):
     """간단한 코드로 실시간 투표 통계 API"""
-    question = get_question_by_code(simple_code, require_active=False)
+    ref = await aget_question_ref_by_code(simple_code, require_active=False)
     
-    if question is None:
+    if ref is None:
         return JsonResponse({'error': 'Vote not found'}, status=404)
     
-    if not question.is_active:
+    if not ref.is_active:
         return JsonResponse({'error': 'Voting is inactive'}, status=410)
     
-    return JsonResponse({
-        'show_results': question.show_results,
-        'o_percentage': question.o_percentage,
-        'x_percentage': question.x_percentage,
-        'total_votes': question.total_votes,
-        'o_votes': question.o_votes,
-        'x_votes': question.x_votes,
-    })
+    response = await room_stats_response(request, 'vote_stats', ref.id)
+    if response is None:
+        return JsonResponse({'error': 'Vote not found'}, status=404)
+    
+    return response
 
 @csrf_exempt
 @require_POST
@@ -361,6 +409,28 @@ def end_vote_by_code(request, simple_code):
     
     return JsonResponse({'success': True, 'message': 'Vote ended successfully'})
 
+def qr_image(request, simple_code):
+    """간단한 코드의 투표 URL QR 코드 이미지 (ETag + 장기 캐시)"""
+    if not re.match(r'^\d{4,5}$', simple_code):
+        raise Http404
+    
+    try:
+        box_size = int(request.GET.get('size', qr.DEFAULT_BOX_SIZE))
+    except ValueError:
+        box_size = qr.DEFAULT_BOX_SIZE
+    box_size = min(max(box_size, 1), qr.MAX_BOX_SIZE)
+    
+    # 이미지는 투표 URL과 크기로만 결정되므로 DB 조회 없이 생성
+    vote_url = request.build_absolute_uri(f'/{simple_code}/')
+    etag = qr.qr_etag(vote_url, box_size)
+    
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(qr.render_qr_png(vote_url, box_size), content_type='image/png')
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    return response
+
 # --- 정적 페이지 ---
 
 def privacy(request):
@@ -372,6 +442,37 @@ def ads_txt(request):
     content = "google.com, pub-8902099051011521, DIRECT, f08c47fec0942fa0"
     return HttpResponse(content, content_type='text/plain')
 
+def room_presence(request, question_id):
+    """방 접속자 수 API (캐시만 읽음)"""
+    return JsonResponse({'count': presence.count(question_id)})
+
+def metrics_denied(request):
+    """메트릭 접근을 막는 응답 (허용하면 None)
+
+    METRICS_TOKEN이 설정되어 있으면 Authorization: Bearer 토큰을 확인하고, 설정되지 않았으면
+    DEBUG일 때만 공개한다 (운영에서 SQL이 담긴 트레이스가 노출되지 않도록).
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        return None if settings.DEBUG else HttpResponse(status=404)
+    if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=403)
+    return None
+
+def metrics_view(request):
+    """Prometheus 메트릭"""
+    denied = metrics_denied(request)
+    if denied is not None:
+        return denied
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def profiler_traces(request):
+    """요청 프로파일러의 샘플 트레이스 (REQUEST_PROFILER가 꺼져 있으면 빈 목록)"""
+    denied = metrics_denied(request)
+    if denied is not None:
+        return denied
+    return JsonResponse({'traces': profiler.export_traces()})
+
 # --- 단답형 투표 관련 뷰들 ---
 
 def short_answer_qr_page(request, question_id):
@@ -385,27 +486,11 @@ def short_answer_qr_page(request, question_id):
     # 세션 활동 업데이트
     update_session_activity(request, question)
     
-    # QR 코드 생성 (간단한 코드 사용)
-    vote_url = request.build_absolute_uri(f'/{question.simple_code}/')
-    simple_url = f"{request.get_host()}/{question.simple_code}"
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(vote_url)
-    qr.make(fit=True)
-    
-    # QR 코드를 이미지로 변환
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffer = BytesIO()
-    img.save(buffer, format='PNG')
-    buffer.seek(0)
-    
-    # Base64로 인코딩
-    qr_code_b64 = base64.b64encode(buffer.getvalue()).decode()
-    
+    # QR 코드 이미지는 qr_image 엔드포인트에서 캐시와 함께 별도로 제공
     context = {
         'question': question,
-        'qr_code': qr_code_b64,
-        'vote_url': vote_url,
-        'simple_url': simple_url,
+        'vote_url': request.build_absolute_uri(f'/{question.simple_code}/'),
+        'simple_url': f"{request.get_host()}/{question.simple_code}",
     }
     
     return render(request, 'voting/short_answer_qr_page.html', context)
@@ -423,11 +508,7 @@ def short_answer_vote_page(request, question_id):
     if request.method == 'POST':
         response_text = request.POST.get('response', '').strip()
         if response_text and len(response_text) <= 200:
-            ShortAnswerResponse.objects.create(
-                question=question,
-                response_text=response_text,
-                client_fingerprint=client_fingerprint
-            )
+            ShortAnswerResponse.submit(question, response_text, client_fingerprint)
             messages.success(request, '응답이 제출되었습니다!')
             # 같은 페이지로 리다이렉트하여 추가 응답 가능
             return redirect('short_answer_vote_page', question_id=question_id)
@@ -445,30 +526,13 @@ def short_answer_vote_page(request, question_id):
     
     return render(request, 'voting/short_answer_vote_page.html', context)
 
-def get_short_answer_stats(request, question_id):
-    """단답형 실시간 통계 API"""
-    question = get_object_or_404(Question, id=question_id)
-    
-    # 전체 응답 개수
-    total_responses = ShortAnswerResponse.objects.filter(question=question).count()
-    
-    # 고유 참여자 수 (중복 제거)
-    unique_participants = ShortAnswerResponse.objects.filter(
-        question=question
-    ).values('client_fingerprint').distinct().count()
-    
-    # 워드 클라우드용 데이터 (각 응답의 빈도수)
-    word_data = ShortAnswerResponse.objects.filter(
-        question=question
-    ).values('response_text').annotate(
-        count=Count('response_text')
-    ).order_by('-count')[:100]  # 상위 100개만
+async def get_short_answer_stats(request, question_id):
+    """단답형 실시간 통계 API (ETag, ?wait= 롱폴링 지원)"""
+    response = await room_stats_response(request, 'short_answer_stats', question_id)
+    if response is None:
+        raise Http404
     
-    return JsonResponse({
-        'total_responses': total_responses,
-        'unique_participants': unique_participants,
-        'word_data': list(word_data),
-    })
+    return response
 
 def short_answer_vote_by_code(request, simple_code):
     """간단한 코드로 단답형 투표 페이지 접근"""
@@ -480,20 +544,16 @@ def short_answer_vote_by_code(request, simple_code):
     if not question.is_active:
         return render(request, 'voting/inactive_vote.html', {'question': question})
     
-    # 단답형이 아니면 일반 투표 페이지로
+    # 단답형이 아니면 일반 투표 페이지로 (vote_by_code는 비동기 뷰이므로 리다이렉트)
     if question.question_type != 'SHORT_ANSWER':
-        return vote_by_code(request, simple_code)
+        return redirect('vote_by_code', simple_code=simple_code)
     
     client_fingerprint = get_client_fingerprint(request)
     
     if request.method == 'POST':
         response_text = request.POST.get('response', '').strip()
         if response_text and len(response_text) <= 200:
-            ShortAnswerResponse.objects.create(
-                question=question,
-                response_text=response_text,
-                client_fingerprint=client_fingerprint
-            )
+            ShortAnswerResponse.submit(question, response_text, client_fingerprint)
             messages.success(request, '응답이 제출되었습니다!')
             return redirect('short_answer_vote_by_code', simple_code=simple_code)
     
@@ -522,52 +582,27 @@ def short_answer_qr_page_by_code(request, simple_code):
     # 세션 활동 업데이트
     update_session_activity(request, question)
     
-    # QR 코드 생성
-    vote_url = request.build_absolute_uri(f'/{question.simple_code}/')
-    simple_url = f"{request.get_host()}/{question.simple_code}"
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(vote_url)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffer = BytesIO()
-    img.save(buffer, format='PNG')
-    buffer.seek(0)
-    
-    qr_code_b64 = base64.b64encode(buffer.getvalue()).decode()
-    
+    # QR 코드 이미지는 qr_image 엔드포인트에서 캐시와 함께 별도로 제공
     context = {
         'question': question,
-        'qr_code': qr_code_b64,
-        'vote_url': vote_url,
-        'simple_url': simple_url,
+        'vote_url': request.build_absolute_uri(f'/{question.simple_code}/'),
+        'simple_url': f"{request.get_host()}/{question.simple_code}",
     }
     
     return render(request, 'voting/short_answer_qr_page.html', context)
 
-def get_short_answer_stats_by_code(request, simple_code):
+async def get_short_answer_stats_by_code(request, simple_code):
     """간단한 코드로 단답형 실시간 통계 API"""
-    question = get_question_by_code(simple_code, require_active=False)
+    ref = await aget_question_ref_by_code(simple_code, require_active=False)
     
-    if question is None:
+    if ref is None:
         return JsonResponse({'error': 'Vote not found'}, status=404)
     
-    if not question.is_active:
+    if not ref.is_active:
         return JsonResponse({'error': 'Voting is inactive'}, status=410)
     
-    total_responses = ShortAnswerResponse.objects.filter(question=question).count()
-    unique_participants = ShortAnswerResponse.objects.filter(
-        question=question
-    ).values('client_fingerprint').distinct().count()
-    
-    word_data = ShortAnswerResponse.objects.filter(
-        question=question
-    ).values('response_text').annotate(
-        count=Count('response_text')
-    ).order_by('-count')[:100]
-    
-    return JsonResponse({
-        'total_responses': total_responses,
-        'unique_participants': unique_participants,
-        'word_data': list(word_data),
-    })
+    response = await room_stats_response(request, 'short_answer_stats', ref.id)
+    if response is None:
+        return JsonResponse({'error': 'Vote not found'}, status=404)
+    
+    return response
@@ -0,0 +1,151 @@
+"""O/X 투표 기록 (HTTP 뷰와 WebSocket 컨슈머 공용)"""
+import hashlib
+import threading
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
+from django.db import transaction, IntegrityError
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import Vote
+from .ingest import vote_buffer, is_buffered
+
+VALID_CHOICES = ('O', 'X')
+
+
+class VotedFingerprints:
+    """질문별 투표한 클라이언트 식별자 집합 (프로세스 메모리, 최근 질문 max_questions개)
+
+    질문을 처음 조회할 때 기존 식별자를 한 번에 불러오고, 이후 이 프로세스에서
+    기록된 투표를 추가한다. 다른 프로세스의 투표는 빠질 수 있으므로 "투표 안 함"은
+    힌트일 뿐이며, 최종 중복 판단은 Vote의 unique_together 제약이 한다.
+    """
+
+    def __init__(self, max_questions=256):
+        self.max_questions = max_questions
+        self._lock = threading.Lock()
+        self._questions = OrderedDict()  # question_id -> set(client_fingerprint)
+
+    def _get(self, question_id):
+        with self._lock:
+            fingerprints = self._questions.get(question_id)
+            if fingerprints is not None:
+                self._questions.move_to_end(question_id)
+            return fingerprints
+
+    def _store(self, question_id, fingerprints):
+        with self._lock:
+            fingerprints |= self._questions.get(question_id, set())
+            self._questions[question_id] = fingerprints
+            if len(self._questions) > self.max_questions:
+                self._questions.popitem(last=False)
+        return fingerprints
+
+    def _queryset(self, question_id):
+        return Vote.objects.filter(question_id=question_id).values_list('client_fingerprint', flat=True)
+
+    def contains(self, question_id, fingerprint):
+        question_id = str(question_id)
+        fingerprints = self._get(question_id)
+        if fingerprints is None:
+            fingerprints = self._store(question_id, set(self._queryset(question_id)))
+        return fingerprint in fingerprints
+
+    async def acontains(self, question_id, fingerprint):
+        """contains의 비동기 버전 (이미 불러온 질문은 DB 조회 없이 바로 판단)"""
+        question_id = str(question_id)
+        fingerprints = self._get(question_id)
+        if fingerprints is None:
+            loaded = {value async for value in self._queryset(question_id)}
+            fingerprints = self._store(question_id, loaded)
+        return fingerprint in fingerprints
+
+    def add(self, question_id, fingerprint):
+        with self._lock:
+            fingerprints = self._questions.get(str(question_id))
+            if fingerprints is not None:
+                fingerprints.add(fingerprint)
+
+    def discard(self, question_id, fingerprint):
+        with self._lock:
+            fingerprints = self._questions.get(str(question_id))
+            if fingerprints is not None:
+                fingerprints.discard(fingerprint)
+
+
+voted_fingerprints = VotedFingerprints()
+
+@receiver(post_delete, sender=Vote)
+def forget_deleted_vote(sender, instance, **kwargs):
+    """삭제된 투표는 다시 투표할 수 있도록 집합에서 제거"""
+    voted_fingerprints.discard(instance.question_id, instance.client_fingerprint)
+
+def make_fingerprint(ip, user_agent):
+    """IP + User-Agent 조합으로 클라이언트 고유 식별자(MD5 해시) 생성"""
+    fingerprint_string = f"{ip}:{user_agent}"
+    return hashlib.md5(fingerprint_string.encode()).hexdigest()
+
+def fingerprint_from_scope(scope):
+    """ASGI scope(WebSocket 등)로 get_client_fingerprint와 같은 식별자 생성"""
+    headers = {name.decode('latin1').lower(): value.decode('latin1') for name, value in scope.get('headers', [])}
+
+    x_forwarded_for = headers.get('x-forwarded-for')
+    if x_forwarded_for:
+        ip = x_forwarded_for.split(',')[0].strip()
+    else:
+        client = scope.get('client') or ('', 0)
+        ip = client[0]
+
+    return make_fingerprint(ip, headers.get('user-agent', ''))
+
+def has_voted(question_id, fingerprint):
+    """이미 투표했는지 확인 (메모리 집합과 아직 저장되지 않은 버퍼 투표 기준, 질문당 최초 1회만 DB 조회)"""
+    if is_buffered() and vote_buffer.contains(question_id, fingerprint):
+        return True
+    return voted_fingerprints.contains(question_id, fingerprint)
+
+async def ahas_voted(question_id, fingerprint):
+    """has_voted의 비동기 버전"""
+    if is_buffered() and vote_buffer.contains(question_id, fingerprint):
+        return True
+    return await voted_fingerprints.acontains(question_id, fingerprint)
+
+def cast_vote(question_id, fingerprint, choice):
+    """투표 기록 (새 투표면 True, 이미 투표했으면 False)
+
+    별도의 exists() 확인 없이 INSERT 한 번으로 처리하고, 중복은 unique_together 제약으로 판단한다.
+    """
+    if choice not in VALID_CHOICES:
+        raise ValueError(f"Invalid choice: {choice}")
+
+    if is_buffered():
+        # 버퍼에 받아 두고 바로 응답 (저장과 득표수 갱신은 flush 스레드에서)
+        if has_voted(question_id, fingerprint):
+            return False
+        created = vote_buffer.submit(question_id, fingerprint, choice)
+    else:
+        try:
+            # INSERT와 득표수 갱신(post_save 시그널)을 한 트랜잭션으로 처리
+            with transaction.atomic():
+                Vote.objects.create(question_id=question_id, choice=choice, client_fingerprint=fingerprint)
+            created = True
+        except IntegrityError:
+            # 이미 투표했거나 같은 기기에서 동시에 두 번 요청한 경우
+            created = False
+
+    voted_fingerprints.add(question_id, fingerprint)
+    return created
+
+async def acast_vote(question_id, fingerprint, choice):
+    """cast_vote의 비동기 버전 (버퍼 모드에서는 스레드 없이 이벤트 루프에서 처리)"""
+    if choice not in VALID_CHOICES:
+        raise ValueError(f"Invalid choice: {choice}")
+
+    if not is_buffered():
+        # INSERT 트랜잭션과 득표수 갱신(post_save 시그널)은 동기 ORM에서만 동작
+        return await sync_to_async(cast_vote)(question_id, fingerprint, choice)
+
+    if await ahas_voted(question_id, fingerprint):
+        return False
+    created = vote_buffer.submit(question_id, fingerprint, choice)
+    voted_fingerprints.add(question_id, fingerprint)
+    return created